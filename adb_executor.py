@@ -0,0 +1,336 @@
+import collections
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import metrics
+
+MAX_KEY_BATCH = 32
+ADB_MODES = ("exec", "session", "monkey")
+
+COMMAND_SECONDS = metrics.Histogram("adb_command_seconds", "ADB command round-trip by command type", ("kind",))
+COMMAND_FAILURES = metrics.Counter("adb_command_failures_total", "ADB commands that failed after a reconnect", ("kind",))
+COMMAND_EXPIRED = metrics.Counter("adb_command_expired_total", "ADB commands dropped after missing their deadline", ("kind",))
+QUEUE_DEPTH = metrics.Gauge("adb_queue_depth", "Commands waiting in the ADB executor queue", ("tv",))
+
+
+class CommandSent(Exception):
+    """The command reached the box but its reply didn't come back, so running
+    it again could repeat it (type text twice, press keys twice)."""
+
+
+class AdbShellSession:
+    """One long-lived `shell:sh` stream to the box.
+
+    Each command is written to sh's stdin followed by an echo of a per-session
+    marker, so its output ends where the marker appears. This skips the
+    host:transport handshake and sh startup that every device.shell() pays.
+    """
+
+    def __init__(self, device, timeout=10):
+        self.timeout = timeout
+        self.conn = device.create_connection(timeout=timeout)
+        self.conn.send("shell:sh")
+        self.marker = f"__ONN_{os.getpid()}_{int(time.time())}__".encode()
+        self.buf = b""
+
+    def run(self, cmd, timeout=None):
+        # stdin is ours, so commands must not read from it
+        # A command that misses its deadline gets the session dropped, like any other failure
+        # timeout can exceed the session default for commands that wait on the box (macros)
+        self.conn.socket.settimeout(timeout or self.timeout)
+        self.conn.write(f"{{ {cmd}\n}} </dev/null 2>&1; echo {self.marker.decode()}$?\n".encode())
+        while True:
+            i = self.buf.find(self.marker)
+            j = self.buf.find(b"\n", i) if i != -1 else -1
+            if j != -1:
+                out, self.buf = self.buf[:i], self.buf[j + 1:]
+                return out.decode("utf-8", "replace")
+            try:
+                chunk = self.conn.read(4096)
+            except Exception as e:
+                raise CommandSent(e) from e
+            if not chunk:
+                raise CommandSent("ADB shell session closed")
+            self.buf += chunk
+
+    def close(self):
+        self.conn.close()
+
+
+class MonkeyKeyInjector:
+    """Injects keys through `monkey --port`, a single JVM that stays up on the box.
+
+    `input keyevent` starts a fresh app_process per call; monkey's network mode
+    reads `press <keycode>` lines from a forwarded TCP port instead. Apps see
+    ActivityManager.isUserAMonkey() == True while it runs, which is why this
+    mode is opt-in.
+    """
+
+    def __init__(self, device, session, port=1080, timeout=5):
+        if not session.run("pidof com.android.commands.monkey").strip():
+            session.run(f"(monkey --port {port} >/dev/null 2>&1 &)")
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        local = probe.getsockname()[1]
+        probe.close()
+        device.forward(f"tcp:{local}", f"tcp:{port}")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.sock = socket.create_connection(("127.0.0.1", local), timeout=timeout)
+                self.reader = self.sock.makefile("rb")
+                self._send(["wake"])
+                break
+            except (OSError, CommandSent):
+                # monkey needs a moment to start listening
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def press(self, codes):
+        self._send([f"press {c}" for c in codes])
+
+    def _send(self, lines):
+        self.sock.sendall(("\n".join(lines) + "\n").encode())
+        try:
+            for _ in lines:
+                if not self.reader.readline():
+                    raise ConnectionError("monkey closed the connection")
+        except Exception as e:
+            raise CommandSent(e) from e
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class AdbCommandExecutor(threading.Thread):
+    """Runs every ADB shell command for one TV off the GUI thread.
+
+    The ppadb device handle is kept between commands and only re-resolved (with
+    an `adb connect`) after a failure. Queued key presses are merged into one
+    `input keyevent a b c ...` call, so a held key never falls behind.
+    Results come back through callbacks; the GUI wires those to Qt signals.
+
+    mode picks the transport: "exec" opens a new shell per command, "session"
+    reuses one AdbShellSession, "monkey" additionally sends keys to a resident
+    MonkeyKeyInjector (falling back to `input` if monkey can't be reached).
+    """
+
+    def __init__(self, ip, port=5555, on_status=None, on_result=None, keepalive=60.0, mode="session", adb_port=5037):
+        super().__init__(daemon=True)
+        if mode not in ADB_MODES:
+            raise ValueError(f"Unknown ADB mode: {mode}")
+        self.ip = ip
+        self.port = port
+        self.mode = mode
+        self.session = None
+        self.monkey = None
+        self.on_status = on_status
+        self.on_result = on_result
+        self.keepalive = keepalive
+        self.adb_port = adb_port
+        self.client = None  # created on the executor thread; importing ppadb isn't free
+        self.device = None
+        self.online = None
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self.running = True
+        self.last_activity = time.monotonic()
+        self.last_submit = 0.0
+
+    @property
+    def serial(self):
+        return f"{self.ip}:{self.port}"
+
+    # --- producer side (any thread) ---
+
+    def key(self, code):
+        self._submit(("key", int(code), None, "key", None))
+
+    def shell(self, cmd, tag=None, kind="shell", timeout=None):
+        # tag: reported with the output through on_result, or a callable that gets
+        # the output directly (on this thread). kind labels the command in metrics.
+        # timeout: seconds from now after which the command is dropped (output None)
+        deadline = time.monotonic() + timeout if timeout else None
+        self._submit(("shell", cmd, tag, kind, deadline))
+
+    def connect(self, ip=None):
+        self._submit(("connect", ip, None, "connect", None))
+
+    def pending(self):
+        return len(self.queue)
+
+    def warm(self, idle=2.0):
+        # Make sure the connection is up before something latency-sensitive is sent
+        if not self.queue and (self.device is None or time.monotonic() - self.last_activity > idle):
+            self.shell("true", kind="warm")
+
+    def _submit(self, item):
+        with self.cond:
+            self.last_submit = time.monotonic()
+            self.queue.append(item)
+            QUEUE_DEPTH.set(len(self.queue), tv=self.serial)
+            self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.queue.clear()
+            self.cond.notify()
+
+    # --- worker side ---
+
+    def run(self):
+        self.client = self._make_client()
+        while True:
+            with self.cond:
+                if self.running and not self.queue:
+                    self.cond.wait(self.keepalive if self.keepalive else None)
+                if not self.running:
+                    return
+                if not self.queue:
+                    item = ("keepalive", None, None, "keepalive", None)
+                else:
+                    item = self.queue.popleft()
+                    if item[0] == "key":
+                        codes = [item[1]]
+                        while self.queue and self.queue[0][0] == "key" and len(codes) < MAX_KEY_BATCH:
+                            codes.append(self.queue.popleft()[1])
+                        item = ("keys", codes, None, "key", None)
+                QUEUE_DEPTH.set(len(self.queue), tv=self.serial)
+            self._execute(item)
+
+    def _execute(self, item):
+        kind, arg, tag, label, deadline = item
+        if kind == "connect":
+            if arg:
+                QUEUE_DEPTH.set(0, tv=self.serial)  # the old address stops reporting
+                self.ip = arg
+            self._disconnect()
+            self._connect()
+            return
+        if kind == "keepalive":
+            if self.device is None or time.monotonic() - self.last_activity < self.keepalive:
+                return
+            arg = "true"
+        output = self._run_shell(arg, kind, label, deadline)
+        if callable(tag):
+            tag(output)
+        elif tag and self.on_result:
+            self.on_result(tag, output)
+
+    def _run_shell(self, cmd, kind="shell", label="shell", deadline=None):
+        for attempt in (0, 1):
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                COMMAND_EXPIRED.inc(kind=label)
+                return None
+            if self.device is None and not self._connect():
+                COMMAND_FAILURES.inc(kind=label)
+                return None
+            try:
+                t0 = time.perf_counter()
+                output = self._dispatch(cmd, kind, remaining)
+                dt = time.perf_counter() - t0
+                COMMAND_SECONDS.observe(dt, kind=label)
+                self.last_activity = time.monotonic()
+                self._set_online(True)
+                return output
+            except CommandSent as e:
+                # Connecting or writing failed is safe to retry; a lost reply is not
+                print(f"ADB command failed: {e}")
+                self._disconnect()
+                break
+            except Exception as e:
+                if attempt:
+                    print(f"ADB command failed: {e}")
+                self._disconnect()
+        COMMAND_FAILURES.inc(kind=label)
+        self._set_online(False)
+        return None
+
+    def _dispatch(self, cmd, kind, timeout=None):
+        if kind == "keys":
+            if self.mode == "monkey":
+                try:
+                    if self.monkey is None:
+                        self.monkey = MonkeyKeyInjector(self.device, self._session())
+                    self.monkey.press(cmd)
+                    return ""
+                except CommandSent:
+                    raise
+                except Exception as e:
+                    print(f"Monkey injector unavailable, using input: {e}")
+                    self.mode = "session"
+                    if self.monkey: self.monkey.close()
+                    self.monkey = None
+            cmd = "input keyevent " + " ".join(map(str, cmd))
+        if self.mode == "exec":
+            output = []
+            self.device.shell(cmd, handler=lambda conn: output.append(self._read_all(conn)), timeout=timeout or 10)
+            return output[0]
+        return self._session().run(cmd, timeout)
+
+    @staticmethod
+    def _read_all(conn):
+        # exec mode: the command is on its way once shell: was accepted
+        try:
+            return conn.read_all().decode("utf-8", "replace")
+        except Exception as e:
+            raise CommandSent(e) from e
+        finally:
+            conn.close()
+
+    def _session(self):
+        if self.session is None:
+            self.session = AdbShellSession(self.device)
+        return self.session
+
+    def _disconnect(self):
+        for handle in (self.monkey, self.session):
+            if handle:
+                try: handle.close()
+                except Exception: pass
+        self.monkey = None
+        self.session = None
+        self.device = None
+
+    def _make_client(self):
+        try:
+            from ppadb.client import Client as AdbClient
+        except ImportError:
+            print("Error: adb-shell/pure-python-adb not found. Run: pip install pure-python-adb")
+            return None
+        return AdbClient(host="127.0.0.1", port=self.adb_port)
+
+    def _connect(self):
+        if not self.client:
+            self._set_online(False)
+            return False
+        try:
+            if not self.client.remote_connect(self.ip, self.port):
+                raise RuntimeError("connect refused")
+        except Exception:
+            # No adb server yet (or it refused): let the adb binary start it
+            try:
+                subprocess.run(["adb", "connect", self.serial], capture_output=True, timeout=10)
+            except Exception as e:
+                print(f"adb connect failed: {e}")
+        try:
+            self.device = self.client.device(self.serial)
+        except Exception:
+            self.device = None
+        self._set_online(self.device is not None)
+        return self.device is not None
+
+    def _set_online(self, online):
+        if online != self.online:
+            self.online = online
+            if self.on_status:
+                self.on_status(online, self.ip)
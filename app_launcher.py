@@ -0,0 +1,73 @@
+import re
+
+# Launch apps through an explicit component (`am start -n`): no monkey start-up
+# and no intent resolution on the box. Each package is resolved once with
+# `cmd package resolve-activity` and cached in the config ("app_cache") with the
+# versionCode it was resolved against; an update or a failing `am start -n`
+# re-resolves. Everything for one launch is a single shell round-trip.
+
+COMPONENT_RE = re.compile(r"^[\w.]+/[\w.$]+$")
+VERSION_RE = re.compile(r"versionCode=(\d+)")
+# What `am start` and the monkey fallback print when nothing was started
+FAILED_RE = re.compile(r"^Error|monkey aborted|No activities found", re.MULTILINE)
+
+RESOLVE = ('c=$(cmd package resolve-activity --brief -a android.intent.action.MAIN '
+           '-c android.intent.category.LEANBACK_LAUNCHER {pkg} | tail -n 1); '
+           'case "$c" in */*) ;; *) c=$(cmd package resolve-activity --brief -a android.intent.action.MAIN '
+           '-c android.intent.category.LAUNCHER {pkg} | tail -n 1);; esac; echo "@@component $c"')
+VERSION = 'echo "@@version $(dumpsys package {pkg} | grep -m1 versionCode)"'
+
+
+class AppLauncher:
+    def __init__(self, cache):
+        self.cache = cache  # package -> {"component", "version"}; a dict inside the saved config
+        self.checked = set()  # packages whose versionCode was confirmed since start-up
+
+    def component(self, pkg):
+        component = (self.cache.get(pkg) or {}).get("component")
+        return component if component and COMPONENT_RE.match(component) else None
+
+    def command(self, pkg, fallback):
+        # fallback: the old intent/monkey command, used when nothing resolves
+        resolve_and_start = RESOLVE.format(pkg=pkg) + f'; case "$c" in */*) am start -n "$c";; *) {fallback};; esac'
+        component = self.component(pkg)
+        if component is None:
+            return f"{resolve_and_start}; {VERSION.format(pkg=pkg)}"
+        cmd = f"if am start -n {component} 2>&1 | grep -q Error; then {resolve_and_start}; fi"
+        if pkg not in self.checked:
+            cmd += "; " + VERSION.format(pkg=pkg)
+        return cmd
+
+    @staticmethod
+    def started(output):
+        # A cached `am start -n` that worked prints nothing (its output goes to grep -q)
+        return output is not None and not FAILED_RE.search(output)
+
+    def handle_result(self, pkg, output):
+        """Fold a launch's output into the cache. Returns True if the cache changed."""
+        if not output:
+            return False
+        old = self.cache.get(pkg) or {}
+        entry = dict(old)
+        resolved = False
+        for line in output.splitlines():
+            if line.startswith("@@component"):
+                resolved = True
+                component = line[len("@@component"):].strip()
+                if COMPONENT_RE.match(component):
+                    entry["component"] = component
+                else:
+                    entry.pop("component", None)
+            elif line.startswith("@@version"):
+                match = VERSION_RE.search(line)
+                if not match:
+                    continue
+                self.checked.add(pkg)
+                if not resolved and entry.get("version") not in (None, match.group(1)):
+                    # App was updated: the next launch resolves again
+                    entry.pop("component", None)
+                entry["version"] = match.group(1)
+        if entry == old:
+            return False
+        self.cache[pkg] = entry
+        return True
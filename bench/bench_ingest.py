@@ -0,0 +1,101 @@
+"""Micro-benchmark: legacy json.loads + bytes(list) vs. the eufy_ingest fast path.
+
+    python bench/bench_ingest.py                      # synthetic 1080p-sized chunks
+    python bench/bench_ingest.py --trace trace.jsonl  # captured payloads
+    python bench/bench_ingest.py --capture trace.jsonl --count 500
+
+A trace is one raw websocket message per line, exactly as the bridge sent it.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import eufy_ingest
+from eufy_ingest import legacy_parse, parse_livestream
+
+
+def synthetic_messages(count, size, serial="T8410P0000000000"):
+    rng = random.Random(1234)
+    msgs = []
+    for i in range(count):
+        kind = "audio" if i % 8 == 7 else "video"
+        n = size // 10 if kind == "audio" else size
+        data = [rng.randrange(256) for _ in range(n)]
+        event = {"source": "device", "event": f"livestream {kind} data", "serialNumber": serial,
+                 "buffer": {"type": "Buffer", "data": data},
+                 "metadata": {"videoCodec": "H264", "videoFPS": 15, "videoWidth": 1920, "videoHeight": 1080}}
+        # Node's JSON.stringify output has no whitespace
+        msgs.append(json.dumps({"type": "event", "event": event}, separators=(",", ":")))
+    return msgs
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def capture(path, count, url="ws://127.0.0.1:3000"):
+    import websocket
+    ws = websocket.create_connection(url)
+    ws.send(json.dumps({"messageId": "set_schema", "command": "set_api_schema", "schemaVersion": 21}))
+    ws.send(json.dumps({"messageId": "start_listening", "command": "start_listening"}))
+    got = 0
+    with open(path, "w") as f:
+        while got < count:
+            msg = ws.recv()
+            if parse_livestream(msg):
+                f.write(msg + "\n")
+                got += 1
+    ws.close()
+    print(f"captured {got} livestream messages to {path}")
+
+
+def run(name, fn, msgs, rounds):
+    total_bytes = 0
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for m in msgs:
+            r = fn(m)
+            total_bytes += len(r[2])
+        best = min(best, time.perf_counter() - t0)
+    per_round = total_bytes // rounds
+    print(f"{name:<22} {best * 1000:9.2f} ms  {len(msgs) / best:10.0f} msg/s  {per_round / best / 1e6:8.1f} MB/s")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trace", help="jsonl file of raw bridge messages")
+    ap.add_argument("--capture", metavar="FILE", help="record livestream messages from the bridge and exit")
+    ap.add_argument("--count", type=int, default=300)
+    ap.add_argument("--size", type=int, default=32768, help="synthetic video chunk size in bytes")
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.capture:
+        capture(args.capture, args.count)
+        return
+
+    eufy_ingest.load_numpy()
+    msgs = load_trace(args.trace) if args.trace else synthetic_messages(args.count, args.size)
+    msgs = [m for m in msgs if legacy_parse(m)]
+    if not msgs:
+        sys.exit("no livestream data messages to benchmark")
+    for m in msgs:
+        assert parse_livestream(m) == legacy_parse(m), "fast path disagrees with legacy path"
+
+    backend = "numpy" if eufy_ingest.np is not None else "orjson" if eufy_ingest.orjson is not None else "stdlib"
+    print(f"{len(msgs)} messages, {sum(len(m) for m in msgs) / 1e6:.1f} MB of JSON, byte decoder: {backend}")
+    legacy = run("legacy (json+list)", legacy_parse, msgs, args.rounds)
+    fast = run("fast path", parse_livestream, msgs, args.rounds)
+    print(f"speedup: {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Stand-in adb server: answers the host protocol ppadb speaks and runs shell commands locally.
+
+    python bench/fake_adb.py --port 5037 --tool-delay 0.25
+
+Shell commands run in a real `sh` with stub functions for the Android tools
+(input, am, monkey, pm, cmd, dumpsys, settings, ...). Each stub sleeps
+--tool-delay to model app_process/JVM start-up and appends a
+"start end tool args" line to the call log, so benchmarks can see exactly
+how many tool invocations a UI action costs. --handshake-delay models the
+host:transport round-trip to the box.
+"""
+import argparse
+import os
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+STUB_TOOLS = ("input", "am", "monkey", "pm", "cmd", "dumpsys", "settings", "wm", "getprop")
+
+PREAMBLE = r"""
+_fake() { _t0=$(date +%s.%N); sleep "$FAKE_TOOL_DELAY"; echo "$_t0 $(date +%s.%N) $*" >> "$FAKE_ADB_LOG"; }
+pidof() { return 1; }
+"""
+
+
+class AdbHandler(socketserver.BaseRequestHandler):
+    def recv_exact(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("client went away")
+            data += chunk
+        return data
+
+    def okay(self, payload=None):
+        msg = b"OKAY"
+        if payload is not None:
+            data = payload.encode()
+            msg += b"%04x" % len(data) + data
+        self.request.sendall(msg)
+
+    def fail(self, reason):
+        data = reason.encode()
+        self.request.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def handle(self):
+        server = self.server.adb
+        serial = None
+        try:
+            while True:
+                request = self.recv_exact(int(self.recv_exact(4), 16)).decode()
+                if request == "host:version":
+                    self.okay("0029")
+                elif request == "host:devices":
+                    self.okay("".join(f"{s}\tdevice\n" for s in sorted(server.devices)))
+                elif request.startswith("host:connect:"):
+                    target = request[len("host:connect:"):]
+                    server.devices.add(target)
+                    self.okay(f"connected to {target}")
+                elif request.startswith("host:transport:"):
+                    serial = request[len("host:transport:"):]
+                    time.sleep(server.handshake_delay)
+                    if serial not in server.devices:
+                        return self.fail(f"device '{serial}' not found")
+                    self.okay()
+                elif request.startswith("host-serial:") and ":forward:" in request:
+                    self.request.sendall(b"OKAYOKAY")
+                elif request.startswith("shell:"):
+                    if serial is None:
+                        return self.fail("no transport")
+                    self.okay()
+                    return self.shell(request[len("shell:"):], serial)
+                else:
+                    return self.fail(f"unsupported: {request}")
+        except (ConnectionError, OSError, ValueError):
+            pass
+
+    def shell(self, command, serial):
+        server = self.server.adb
+        t0 = time.monotonic()
+        proc = subprocess.Popen(["sh"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                env=server.env, bufsize=0)
+        proc.stdin.write(server.preamble.encode())
+        if command and command != "sh":
+            out, _ = proc.communicate((command + "\n").encode())
+            self.request.sendall(out)
+            server.record(t0, serial, "exec", command)
+            return
+        # Interactive session: pump socket -> sh stdin and sh stdout -> socket
+        server.record(t0, serial, "session", "sh")
+
+        def pump_out():
+            while True:
+                data = os.read(proc.stdout.fileno(), 65536)
+                if not data:
+                    break
+                self.request.sendall(data)
+            try:
+                self.request.shutdown(2)
+            except OSError:
+                pass
+
+        threading.Thread(target=pump_out, daemon=True).start()
+        try:
+            while True:
+                data = self.request.recv(65536)
+                if not data:
+                    break
+                proc.stdin.write(data)
+        except OSError:
+            pass
+        finally:
+            proc.kill()
+
+
+class FakeAdbServer:
+    def __init__(self, host="127.0.0.1", port=5037, handshake_delay=0.02, tool_delay=0.25, devices=(), responses=None):
+        self.handshake_delay = handshake_delay
+        self.devices = set(devices)
+        self.connections = []
+        with tempfile.NamedTemporaryFile(prefix="fake_adb_", suffix=".log", delete=False) as f:
+            self.log_path = f.name
+        self.env = dict(os.environ, FAKE_ADB_LOG=self.log_path, FAKE_TOOL_DELAY=str(tool_delay))
+        # responses: tool -> shell snippet printed after the stub runs (canned dumpsys output etc.)
+        responses = responses or {}
+        self.preamble = PREAMBLE + "".join(
+            f'{tool}() {{ _fake {tool} "$@"; {responses.get(tool, ":")}; }}\n' for tool in STUB_TOOLS)
+        self.lock = threading.Lock()
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), AdbHandler)
+        self.server.daemon_threads = True
+        self.server.adb = self
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        try:
+            os.remove(self.log_path)
+        except OSError:
+            pass
+
+    def record(self, t0, serial, service, command):
+        with self.lock:
+            self.connections.append((t0, serial, service, command))
+
+    def tool_calls(self):
+        # [(start, end, tool, args)] in wall-clock seconds, one per stubbed tool invocation
+        calls = []
+        with open(self.log_path) as f:
+            for line in f:
+                start, end, tool, *args = line.split()
+                calls.append((float(start), float(end), tool, " ".join(args)))
+        return calls
+
+    def reset(self):
+        with self.lock:
+            self.connections.clear()
+        open(self.log_path, "w").close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5037)
+    ap.add_argument("--handshake-delay", type=float, default=0.02)
+    ap.add_argument("--tool-delay", type=float, default=0.25)
+    args = ap.parse_args()
+    server = FakeAdbServer(args.host, args.port, args.handshake_delay, args.tool_delay).start()
+    print(f"READY {server.port}  (tool calls logged to {server.log_path})", flush=True)
+    try:
+        last = 0
+        while True:
+            time.sleep(1)
+            calls = server.tool_calls()
+            for start, end, tool, rest in calls[last:]:
+                print(f"{tool} {rest}  [{(end - start) * 1000:.0f} ms]", flush=True)
+            last = len(calls)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
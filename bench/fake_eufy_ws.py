@@ -0,0 +1,325 @@
+"""Stand-in for eufy-security-ws: a tiny stdlib WebSocket server speaking the schema-21 subset we use.
+
+    python bench/fake_eufy_ws.py --port 3000 --motion-every 20
+    python bench/fake_eufy_ws.py --trace trace.jsonl --bitrate 0 --frames 2000
+
+Handles set_api_schema, start_listening, device.start_livestream and
+device.stop_livestream. Livestreams replay a captured trace (see
+bench_ingest.py --capture), the access units of a raw .h264 file, or
+synthetic Annex-B chunks, paced to --bitrate (0 = as fast as the socket
+takes them). Extra commands drive benchmarks: fake.trigger_motion
+(returns the server's time.monotonic() when the event went out),
+fake.stats, fake.drop (closes every other client's connection) and
+fake.hang (every other client's connection goes silent, like a half-open
+socket: no events, no stream data, no pongs).
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from eufy_ingest import parse_livestream
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+SCHEMA_VERSION = 21
+
+
+def encode(obj):
+    # Same shape as Node's JSON.stringify output
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def livestream_message(serial, kind, payload):
+    return encode({"type": "event", "event": {
+        "source": "device", "event": f"livestream {kind} data", "serialNumber": serial,
+        "buffer": {"type": "Buffer", "data": list(payload)},
+        "metadata": {"videoCodec": "H264", "videoFPS": 15, "videoWidth": 1920, "videoHeight": 1080} if kind == "video" else {"audioCodec": "AAC"},
+    }})
+
+
+def synthetic_chunks(bitrate, fps, gop, count=None):
+    rng = random.Random(21)
+    size = max(64, int((bitrate or 2_000_000) / 8 / fps))
+    chunks = []
+    for i in range(count or gop * 2):
+        nal = b"\x00\x00\x00\x01\x67\x64\x00\x28\x00\x00\x00\x01\x68\xee\x3c\x80\x00\x00\x00\x01\x65" if i % gop == 0 else b"\x00\x00\x00\x01\x41"
+        chunks.append(("video", nal + rng.randbytes(size - len(nal))))
+        chunks.append(("audio", b"\xff\xf1\x50\x80\x02\x1f\xfc" + rng.randbytes(9)))
+    return chunks
+
+
+def h264_chunks(path):
+    data = open(path, "rb").read()
+    starts = [m.start() for m in re.finditer(b"\x00\x00\x01", data)]
+    chunks, current = [], b""
+    for n, i in enumerate(starts):
+        begin = i - 1 if i and data[i - 1] == 0 else i
+        end = starts[n + 1] if n + 1 < len(starts) else len(data)
+        if end < len(data) and data[end - 1] == 0:
+            end -= 1
+        current += data[begin:end]
+        if data[i + 3] & 0x1F in (1, 5):  # a slice closes the access unit
+            chunks.append(("video", current))
+            current = b""
+    return chunks
+
+
+def trace_chunks(path):
+    chunks = []
+    with open(path) as f:
+        for line in f:
+            parsed = parse_livestream(line.rstrip("\n"))
+            if parsed:
+                chunks.append((parsed[0], parsed[2]))
+    return chunks
+
+
+class WebSocketHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.lock = threading.Lock()
+        self.listening = False
+        self.streams = {}
+        self.closed = False
+        self.hung = False
+
+    def handle(self):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            request += data
+        key = re.search(rb"Sec-WebSocket-Key:\s*(\S+)", request, re.I)
+        accept = base64.b64encode(hashlib.sha1(key.group(1) + WS_GUID.encode()).digest()).decode()
+        self.request.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        self.server.bridge.clients.add(self)
+        self.send({"type": "version", "driverVersion": "fake", "serverVersion": "fake",
+                   "minSchemaVersion": 0, "maxSchemaVersion": SCHEMA_VERSION})
+        try:
+            while True:
+                opcode, payload = self.recv_frame()
+                if opcode is None or opcode == 0x8:
+                    break
+                if self.hung:
+                    continue
+                if opcode == 0x9:
+                    self.send_frame(0xA, payload)
+                elif opcode == 0x1:
+                    self.server.bridge.on_command(self, json.loads(payload))
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            self.server.bridge.clients.discard(self)
+
+    def recv_exact(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("client went away")
+            data += chunk
+        return data
+
+    def recv_frame(self):
+        try:
+            b1, b2 = self.recv_exact(2)
+        except ConnectionError:
+            return None, None
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self.recv_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self.recv_exact(8))[0]
+        mask = self.recv_exact(4) if b2 & 0x80 else None
+        payload = self.recv_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return b1 & 0x0F, payload
+
+    def send_frame(self, opcode, payload):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack(">BB", 0x80 | opcode, n)
+        elif n < 65536:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+        with self.lock:
+            self.request.sendall(header + payload)
+
+    def send(self, obj):
+        self.send_raw(encode(obj) if isinstance(obj, dict) else obj)
+
+    def send_raw(self, text):
+        self.send_frame(0x1, text.encode())
+
+
+class FakeEufyBridge:
+    def __init__(self, host="127.0.0.1", port=3000, serials=("T8410P0000000001",), bitrate=2_000_000,
+                 fps=15, gop=15, wake_delay=0.0, frames=0, chunks=None):
+        self.serials = list(serials)
+        self.bitrate = bitrate
+        self.fps = fps
+        self.wake_delay = wake_delay
+        self.frames = frames
+        self.chunks = chunks or synthetic_chunks(bitrate, fps, gop)
+        self.encoded = {}
+        self.clients = set()
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), WebSocketHandler)
+        self.server.daemon_threads = True
+        self.server.bridge = self
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def messages_for(self, serial):
+        # Encode once per camera; JSON-encoding big int arrays is the slow part
+        if serial not in self.encoded:
+            self.encoded[serial] = [(kind, len(p), livestream_message(serial, kind, p)) for kind, p in self.chunks]
+        return self.encoded[serial]
+
+    def broadcast(self, event):
+        for client in list(self.clients):
+            if client.listening and not client.hung:
+                try:
+                    client.send({"type": "event", "event": event})
+                except OSError:
+                    pass
+
+    def trigger_motion(self, serial=None):
+        serial = serial or self.serials[0]
+        ts = time.monotonic()
+        self.broadcast({"source": "device", "event": "motion detected", "serialNumber": serial, "state": True})
+        return ts
+
+    def on_command(self, client, msg):
+        command = msg.get("command")
+        reply = {"type": "result", "messageId": msg.get("messageId"), "success": True, "result": {}}
+        serial = msg.get("serialNumber")
+        if command == "set_api_schema":
+            pass
+        elif command == "start_listening":
+            client.listening = True
+            reply["result"] = {"state": {
+                "driver": {"version": "fake", "connected": True, "pushConnected": True},
+                "stations": [], "devices": [{"serialNumber": s, "name": f"Fake {s[-4:]}"} for s in self.serials]}}
+        elif command == "device.start_livestream":
+            if serial not in self.serials:
+                reply.update(success=False, errorCode="device_not_found")
+            elif serial not in client.streams:
+                stop = threading.Event()
+                client.streams[serial] = stop
+                threading.Thread(target=self.stream, args=(client, serial, stop), daemon=True).start()
+        elif command == "device.stop_livestream":
+            stop = client.streams.pop(serial, None)
+            if stop:
+                stop.set()
+        elif command == "fake.trigger_motion":
+            reply["result"] = {"ts": self.trigger_motion(serial)}
+        elif command in ("fake.drop", "fake.hang"):
+            for other in list(self.clients):
+                if other is client:
+                    continue
+                if command == "fake.hang":
+                    other.hung = True
+                else:
+                    try:
+                        other.request.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+        elif command == "fake.stats":
+            reply["result"] = {"bytesSent": self.bytes_sent, "messagesSent": self.messages_sent}
+        else:
+            reply.update(success=False, errorCode="unknown_command")
+        client.send(reply)
+
+    def stream(self, client, serial, stop):
+        if self.wake_delay:
+            stop.wait(self.wake_delay)
+        event = {"source": "device", "serialNumber": serial}
+        try:
+            client.send({"type": "event", "event": dict(event, event="livestream started")})
+            messages = self.messages_for(serial)
+            interval = 1.0 / self.fps if self.bitrate else 0.0
+            next_at = time.monotonic()
+            frames = 0
+            i = 0
+            while not stop.is_set() and not client.closed:
+                if client.hung:
+                    stop.wait(0.05)
+                    continue
+                kind, size, text = messages[i % len(messages)]
+                i += 1
+                if kind == "video":
+                    if self.frames and frames >= self.frames:
+                        break
+                    frames += 1
+                    if interval:
+                        delay = next_at - time.monotonic()
+                        if delay > 0 and stop.wait(delay):
+                            break
+                        next_at += interval
+                client.send_raw(text)
+                self.bytes_sent += size
+                self.messages_sent += 1
+            client.send({"type": "event", "event": dict(event, event="livestream stopped")})
+        except OSError:
+            pass
+        client.streams.pop(serial, None)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=3000)
+    ap.add_argument("--serial", action="append", help="camera serial (repeatable)")
+    ap.add_argument("--bitrate", type=int, default=2_000_000, help="video bits/s; 0 = unthrottled")
+    ap.add_argument("--fps", type=int, default=15)
+    ap.add_argument("--wake-delay", type=float, default=0.0, help="simulated P2P wake-up before the stream starts")
+    ap.add_argument("--frames", type=int, default=0, help="stop each livestream after N video frames")
+    ap.add_argument("--trace", help="replay livestream payloads from a captured trace")
+    ap.add_argument("--h264", help="replay access units from a raw Annex-B .h264 file")
+    ap.add_argument("--motion-every", type=float, default=0.0, help="emit motion for every camera every N seconds")
+    args = ap.parse_args()
+
+    chunks = trace_chunks(args.trace) if args.trace else h264_chunks(args.h264) if args.h264 else None
+    bridge = FakeEufyBridge(args.host, args.port, args.serial or ("T8410P0000000001",), args.bitrate,
+                            args.fps, wake_delay=args.wake_delay, frames=args.frames, chunks=chunks).start()
+    print(f"READY {bridge.port}", flush=True)
+    try:
+        while True:
+            if args.motion_every:
+                time.sleep(args.motion_every)
+                for serial in bridge.serials:
+                    bridge.trigger_motion(serial)
+            else:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        bridge.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""End-to-end benchmarks against the stand-in bridge and adb server (no camera or TV needed).
+
+    python bench/run_suite.py                    # everything
+    python bench/run_suite.py --only keys        # motion | throughput | cpu | keys | reconnect
+    python bench/run_suite.py --json results.json
+
+motion      motion event -> first recorded byte on disk (p50/p95 over --trials)
+throughput  unthrottled livestream ingest in MB/s through websocket, decode and writer
+cpu         CPU seconds per second per camera at --bitrate, --streams cameras at once
+keys        ADB command round-trip and a 10-key burst, per executor mode
+reconnect   bridge drop / half-open socket -> listening again and recording resumed, mid-clip
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+import websocket
+
+from adb_executor import AdbCommandExecutor
+from fake_adb import FakeAdbServer
+
+SERIAL = "T8410P0000000001"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+class Bridge:
+    """Runs fake_eufy_ws.py in its own process so its CPU doesn't count against ours."""
+
+    def __init__(self, *args):
+        self.proc = subprocess.Popen([sys.executable, os.path.join(HERE, "fake_eufy_ws.py"), "--port", "0", *args],
+                                     stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline().split()
+        if not line or line[0] != "READY":
+            raise RuntimeError("fake bridge failed to start")
+        self.url = f"ws://127.0.0.1:{line[1]}"
+        self.control = websocket.create_connection(self.url)
+        self.control.recv()  # version banner
+        self.n = 0
+
+    def call(self, command, **kwargs):
+        self.n += 1
+        message_id = f"bench-{self.n}"
+        self.control.send(json.dumps(dict(kwargs, messageId=message_id, command=command)))
+        while True:
+            msg = json.loads(self.control.recv())
+            if msg.get("messageId") == message_id:
+                return msg.get("result", {})
+
+    def close(self):
+        self.control.close()
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def start_worker(url, record_dir, **options):
+    from eufy_bridge import EufyBridge
+    worker = EufyBridge(record_dir, url=url, **options)
+    worker.start()
+    deadline = time.monotonic() + 5
+    while not (worker.ws and worker.ws.sock and worker.ws.sock.connected):
+        if time.monotonic() > deadline:
+            raise RuntimeError("worker did not connect to the fake bridge")
+        time.sleep(0.01)
+    time.sleep(0.2)  # let start_listening land
+    return worker
+
+
+def wait_for(predicate, timeout, step=0.001):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(step)
+    return None
+
+
+def bench_motion(args):
+    bridge = Bridge("--wake-delay", str(args.wake_delay))
+    worker = start_worker(bridge.url, tempfile.mkdtemp(prefix="bench_rec_"), backend=args.backend)
+    samples = []
+    try:
+        for _ in range(args.trials):
+            t0 = bridge.call("fake.trigger_motion", serialNumber=SERIAL)["ts"]
+            session = wait_for(lambda: worker.sessions.get(SERIAL), 5)
+            writer = session and wait_for(lambda: session.writer if session.writer and session.writer.written_bytes else None, 10)
+            if writer:
+                samples.append((time.monotonic() - t0) * 1000)
+            session.stop_recording()
+            time.sleep(0.3)
+    finally:
+        worker.stop()
+        bridge.close()
+    return {"trials": len(samples), "p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95),
+            "backend": args.backend, "wake_delay_s": args.wake_delay}
+
+
+def bench_throughput(args):
+    bridge = Bridge("--bitrate", "0", "--frames", str(args.frames))
+    worker = start_worker(bridge.url, tempfile.mkdtemp(prefix="bench_rec_"), backend=args.backend,
+                          drop_policy="block", tail_seconds=600, max_clip_seconds=600)
+    try:
+        bridge.call("fake.trigger_motion", serialNumber=SERIAL)
+        session = wait_for(lambda: worker.sessions.get(SERIAL), 5)
+        # session.writer is set just before its thread starts
+        writer = wait_for(lambda: session.writer if session.writer and session.writer.is_alive() else None, 10)
+        t0 = time.monotonic()
+        wait_for(lambda: not writer.is_alive(), 120, step=0.01)
+        elapsed = time.monotonic() - t0
+        stats = writer.stats()
+    finally:
+        worker.stop()
+        bridge.close()
+    return {"bytes": stats["written_bytes"], "seconds": elapsed, "mb_per_s": stats["written_bytes"] / elapsed / 1e6,
+            "dropped_chunks": stats["dropped_chunks"]}
+
+
+def bench_cpu(args):
+    serials = [f"T8410P00000000{i:02d}" for i in range(1, args.streams + 1)]
+    bridge = Bridge("--bitrate", str(args.bitrate), *sum((["--serial", s] for s in serials), []))
+    worker = start_worker(bridge.url, tempfile.mkdtemp(prefix="bench_rec_"), backend=args.backend,
+                          tail_seconds=600, max_clip_seconds=600)
+    try:
+        for serial in serials:
+            bridge.call("fake.trigger_motion", serialNumber=serial)
+        wait_for(lambda: all(worker.sessions.get(s) and worker.sessions[s].recording_active for s in serials), 10)
+        time.sleep(1.0)
+        cpu0, t0 = time.process_time(), time.monotonic()
+        time.sleep(args.seconds)
+        cpu, wall = time.process_time() - cpu0, time.monotonic() - t0
+    finally:
+        worker.stop()
+        bridge.close()
+    return {"streams": args.streams, "bitrate": args.bitrate, "cpu_percent_per_stream": cpu / wall / args.streams * 100,
+            "backend": args.backend, "note": "in-process CPU only; the ffmpeg backend's child processes are not counted"}
+
+
+def bench_reconnect(args):
+    from eufy_bridge import BRIDGE_RECONNECT_SECONDS
+    bridge = Bridge()
+    worker = start_worker(bridge.url, tempfile.mkdtemp(prefix="bench_rec_"), backend=args.backend,
+                          tail_seconds=600, max_clip_seconds=600, ping_interval=1.0, ping_timeout=0.5)
+    results = {}
+    try:
+        bridge.call("fake.trigger_motion", serialNumber=SERIAL)
+        session = wait_for(lambda: worker.sessions.get(SERIAL), 5)
+        writer = wait_for(lambda: session.writer if session.writer and session.writer.written_bytes else None, 10)
+        for fault in ("drop", "hang"):
+            count = BRIDGE_RECONNECT_SECONDS.summary()["count"] if BRIDGE_RECONNECT_SECONDS.summary() else 0
+            t0 = time.monotonic()
+            bridge.call(f"fake.{fault}")
+            if not wait_for(lambda: (BRIDGE_RECONNECT_SECONDS.summary() or {"count": 0})["count"] > count, 30):
+                results[fault] = {"error": "did not reconnect"}
+                continue
+            reconnected = time.monotonic() - t0
+            written = writer.written_bytes
+            resumed = wait_for(lambda: writer.written_bytes > written, 10) and time.monotonic() - t0
+            results[fault] = {"reconnect_ms": reconnected * 1000, "recording_resumed_ms": resumed * 1000 if resumed else None,
+                              "same_clip": session.writer is writer,
+                              "reconnect_metric_ms": BRIDGE_RECONNECT_SECONDS.summary()["last"] * 1000}
+    finally:
+        worker.stop()
+        bridge.close()
+    results["ping_interval_s"] = 1.0
+    return results
+
+
+def bench_keys(args):
+    server = FakeAdbServer(port=0, handshake_delay=args.handshake_delay, tool_delay=args.tool_delay).start()
+    results = {}
+    try:
+        for mode in ("exec", "session"):
+            done = {}
+            event = threading.Event()
+
+            def on_result(tag, output):
+                done[tag] = time.monotonic()
+                event.set()
+
+            ex = AdbCommandExecutor("10.0.0.2", on_result=on_result, mode=mode, adb_port=server.port, keepalive=0)
+            ex.start()
+            ex.connect()
+            rtts = []
+            for i in range(args.trials + 1):
+                event.clear()
+                t0 = time.monotonic()
+                ex.shell("input keyevent 19", tag=f"k{i}")
+                event.wait(10)
+                if i:  # the first one pays the connect/session setup
+                    rtts.append((done[f"k{i}"] - t0) * 1000)
+            server.reset()
+            event.clear()
+            t0 = time.monotonic()
+            for _ in range(10):
+                ex.key(24)
+            ex.shell("true", tag="fence")
+            event.wait(30)
+            burst = (done["fence"] - t0) * 1000
+            inputs = sum(1 for call in server.tool_calls() if call[2] == "input")
+            ex.stop()
+            results[mode] = {"rtt_p50_ms": percentile(rtts, 0.5), "rtt_p95_ms": percentile(rtts, 0.95),
+                             "burst10_ms": burst, "burst10_input_calls": inputs}
+    finally:
+        server.stop()
+    results["tool_delay_s"] = args.tool_delay
+    results["handshake_delay_s"] = args.handshake_delay
+    return results
+
+
+BENCHMARKS = {"motion": bench_motion, "throughput": bench_throughput, "cpu": bench_cpu, "keys": bench_keys,
+              "reconnect": bench_reconnect}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", action="append", choices=sorted(BENCHMARKS))
+    ap.add_argument("--backend", default="ts", help="recorder backend (ffmpeg needs ffmpeg on PATH)")
+    ap.add_argument("--trials", type=int, default=10)
+    ap.add_argument("--wake-delay", type=float, default=0.0)
+    ap.add_argument("--frames", type=int, default=1500)
+    ap.add_argument("--streams", type=int, default=2)
+    ap.add_argument("--bitrate", type=int, default=2_000_000)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--tool-delay", type=float, default=0.25, help="simulated `input`/`am` start-up on the box")
+    ap.add_argument("--handshake-delay", type=float, default=0.02, help="simulated host:transport round-trip")
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args()
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"== {name}", flush=True)
+        results[name] = BENCHMARKS[name](args)
+        print(json.dumps(results[name], indent=2), flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+
+# Local control protocol over a Unix-domain socket: one JSON object per line
+# each way.
+#   -> {"cmd": "key", "args": ["home"], "tv": "Office"}
+#   <- {"ok": true, "result": null}   or   {"ok": false, "error": "unknown key: hom"}
+# Commands: key, text, clear, search, launch, wake, macro, status, stats (see
+# RemoteCore.execute). A connection may send any number of requests. Only
+# this module is imported by remote_ctl.py, so keep it free of heavy imports.
+
+
+def socket_path():
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    # Both directories are private to the user (0700), which is what keeps others out
+    return os.path.join(runtime, "onn_remote.sock") if runtime else os.path.expanduser("~/.onn_remote/control.sock")
+
+
+def request(cmd, args=(), tv=None, path=None, timeout=5.0):
+    """Send one command and return its result; raises RuntimeError with the server's error."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or socket_path())
+        sock.sendall(json.dumps({"cmd": cmd, "args": list(args), "tv": tv}).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        sock.close()
+    try:
+        # A server that dies mid-request leaves nothing, or half a line
+        reply = json.loads(data) if data.endswith(b"\n") else None
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict):
+        raise RuntimeError("no reply")
+    if not reply.get("ok"):
+        raise RuntimeError(reply.get("error", "failed"))
+    return reply.get("result")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                reply = {"ok": True, "result": self.server.execute(req["cmd"], req.get("args") or (), req.get("tv"))}
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"ok": False, "error": str(e)}
+            except Exception as e:
+                print(f"Control command error: {e}")
+                reply = {"ok": False, "error": f"internal error: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class ControlServer(threading.Thread):
+    """Serves execute(cmd, args, tv) on a Unix socket, one thread per connection."""
+
+    def __init__(self, execute, path):
+        super().__init__(daemon=True)
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent, mode=0o700)
+        if os.path.exists(path):
+            # Left over from a crash, unless something is still listening
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise OSError(f"{path} is in use by another instance")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(path)
+            finally:
+                probe.close()
+        # No umask games: other threads are already creating files. The private
+        # directory guards the default paths; the chmod covers a custom one.
+        self.server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+        self.server.daemon_threads = True
+        self.server.execute = execute
+        os.chmod(path, 0o600)
+
+    def run(self):
+        self.server.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,168 @@
+import re
+import threading
+import time
+
+from adb_executor import COMMAND_SECONDS
+
+# One shell round-trip for everything the GUI wants to know about the TV.
+PROBE = ("echo @@power; dumpsys power | grep -m1 mWakefulness=; "
+         "echo @@focus; dumpsys window | grep -m2 -E 'mFocusedApp=|mCurrentFocus='; "
+         "echo @@volume; dumpsys audio | grep -m1 -A8 '^- STREAM_MUSIC:'")
+
+_PACKAGE_RE = re.compile(r"u\d+ ([\w.]+)/")
+PROBE_TIMEOUT = 10
+
+
+class DeviceState:
+    """Last known TV state (foreground package, screen, ...), shared across threads.
+
+    Every value remembers when it was observed, so readers decide how old is
+    too old: get("foreground", max_age=10) returns the default once stale.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def update(self, **values):
+        now = time.monotonic()
+        with self.lock:
+            for key, value in values.items():
+                self.values[key] = (value, now)
+
+    def get(self, key, max_age=None, default=None):
+        with self.lock:
+            item = self.values.get(key)
+        if item is None or (max_age is not None and time.monotonic() - item[1] > max_age):
+            return default
+        return item[0]
+
+    def forget(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.values.pop(key, None)
+
+    def snapshot(self):
+        with self.lock:
+            return {key: value for key, (value, _) in self.values.items()}
+
+
+def parse_probe(output):
+    sections = {}
+    name = None
+    for line in output.splitlines():
+        if line.startswith("@@"):
+            name = line[2:].strip()
+            sections[name] = []
+        elif name:
+            sections[name].append(line.strip())
+    values = {}
+    for line in sections.get("power", ()):
+        if line.startswith("mWakefulness="):
+            values["screen"] = line.split("=", 1)[1]
+    focus = {}
+    for line in sections.get("focus", ()):
+        match = _PACKAGE_RE.search(line)
+        if match:
+            focus[line.split("=", 1)[0]] = match.group(1)
+    if focus:
+        values["foreground"] = focus.get("mFocusedApp") or focus.get("mCurrentFocus")
+    current = None
+    for line in sections.get("volume", ()):
+        key, _, rest = line.partition(":")
+        if key == "Muted":
+            values["muted"] = rest.strip() == "true"
+        elif key == "Max" and rest.strip().isdigit():
+            values["volume_max"] = int(rest)
+        elif key == "streamVolume" and rest.strip().isdigit():
+            values["volume"] = int(rest)
+        elif key == "Current" and current is None:
+            # "Current: 2 (speaker): 10, 400 (hdmi): 7" on older releases
+            match = re.search(r"\): (\d+)", rest)
+            current = int(match.group(1)) if match else None
+    if "volume" not in values and current is not None:
+        values["volume"] = current
+    return values
+
+
+class DevicePoller(threading.Thread):
+    """Keeps a DeviceState fresh by running PROBE on the TV.
+
+    The probe runs `active` seconds after the user's last command (to catch the
+    app they switched to), every `idle` seconds while the screen is on, every
+    `asleep` seconds while it is off, and backs off exponentially up to
+    `offline_max` while the TV is unreachable.
+
+    While the executor is connected the probe goes over its own exec-mode
+    connection from this thread, so a key press never waits behind the
+    dumpsys calls. When the executor has no device, or that probe fails, it
+    goes through the executor's queue instead, which reconnects first.
+    """
+
+    def __init__(self, adb, state, on_change=None, active=1.5, idle=10.0, asleep=30.0, offline_max=30.0):
+        super().__init__(daemon=True)
+        self.adb = adb
+        self.state = state
+        self.on_change = on_change
+        self.active = active
+        self.idle = idle
+        self.asleep = asleep
+        self.offline_max = offline_max
+        self.interval = 0.0
+        self.failures = 0
+        self.last_probe = 0.0
+        self.probe_submitted = 0.0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(0.25):
+            if self.adb.pending():
+                continue
+            due = self.last_probe + self.interval
+            if self.adb.last_submit > self.probe_submitted:
+                due = min(due, self.adb.last_submit + self.active)
+            if time.monotonic() >= due:
+                self.probe()
+
+    def probe(self):
+        t0 = time.monotonic()
+        self.probe_submitted = self.adb.last_submit
+        device = self.adb.device
+        if device is None:
+            output = self.queued_probe()
+        else:
+            try:
+                output = device.shell(PROBE, timeout=PROBE_TIMEOUT)
+                COMMAND_SECONDS.observe(time.monotonic() - t0, kind="probe")
+            except Exception:
+                # Dead connection: let the executor find out and reconnect
+                output = self.queued_probe()
+        self.last_probe = time.monotonic()
+        if output is None:
+            self.failures += 1
+            self.interval = min(self.offline_max, 2.0 ** self.failures)
+            values = {"online": False}
+        else:
+            self.failures = 0
+            values = dict(parse_probe(output), online=True)
+            self.interval = self.idle if values.get("screen", "Awake") == "Awake" else self.asleep
+        changed = any(self.state.get(key) != value for key, value in values.items())
+        self.state.update(latency_ms=round((self.last_probe - t0) * 1000), **values)
+        if changed and self.on_change:
+            self.on_change(self.state.snapshot())
+
+    def queued_probe(self):
+        done = threading.Event()
+        result = []
+
+        def on_output(output):
+            result.append(output)
+            done.set()
+
+        self.adb.shell(PROBE, tag=on_output, kind="probe")
+        self.probe_submitted = self.adb.last_submit
+        # A stuck executor counts as a failed probe, so the interval still backs off
+        return result[0] if done.wait(PROBE_TIMEOUT * 3) else None
+
+    def stop(self):
+        self.stopped.set()
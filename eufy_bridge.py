@@ -0,0 +1,193 @@
+import json
+import random
+import threading
+import time
+
+import metrics
+from eufy_ingest import parse_livestream, json_loads, load_numpy
+from eufy_recorder import RecordingSession
+
+BRIDGE_CONNECTED = metrics.Gauge("eufy_bridge_connected", "1 while the eufy-security-ws socket is open")
+BRIDGE_RECONNECTS = metrics.Counter("eufy_bridge_reconnects_total", "Bridge connection attempts after a drop")
+BRIDGE_RECONNECT_SECONDS = metrics.Histogram("eufy_bridge_reconnect_seconds", "Bridge drop detected to listening again")
+WRITER_JOIN_SECONDS = 5.0  # how long stop() waits for the last clips to reach the disk
+
+
+class EufyBridge(threading.Thread):
+    """eufy-security-ws client: motion events in, one RecordingSession per camera.
+
+    Runs on its own thread with no Qt dependency; the GUI and the daemon get
+    log lines, recording on/off and raw motion events through callbacks, all
+    called on this thread.
+
+    The socket is pinged every ping_interval seconds, so a half-open connection
+    is dropped within ping_interval + ping_timeout instead of silently losing
+    events. After a drop the first reconnect is immediate, later ones back off
+    exponentially (with jitter) up to backoff_max. Recordings survive a drop
+    shorter than blip_seconds: on reconnect every camera that was streaming
+    asks for its livestream again and keeps writing the same clip.
+    """
+
+    def __init__(self, record_dir, queue_bytes=8 * 1024 * 1024, drop_policy="drop_until_keyframe",
+                 url="ws://127.0.0.1:3000", log=None, recording=None, on_motion=None,
+                 ping_interval=5.0, ping_timeout=3.0, backoff_base=0.5, backoff_max=30.0, blip_seconds=15.0,
+                 **session_options):
+        super().__init__(daemon=True)
+        self.log = log or (lambda msg: None)
+        self.recording = recording  # recording(serial, active)
+        self.on_motion = on_motion  # on_motion(serial), for every motion event
+        self.url = url
+        self.record_dir = record_dir
+        self.ws = None
+        self.running = True
+        self.queue_bytes = queue_bytes
+        self.drop_policy = drop_policy
+        self.session_options = session_options  # tail/max clip/keep-warm seconds for RecordingSession
+        self.sessions = {}  # serialNumber -> RecordingSession
+        self.ping_interval = ping_interval
+        self.ping_timeout = min(ping_timeout, ping_interval * 0.8) if ping_interval else None
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.blip_seconds = blip_seconds
+        self.wakeup = threading.Event()  # cuts a backoff sleep short on stop()
+        self.connected = False
+        self.dropped_at = None  # monotonic time the current outage was noticed
+        self.grace_timer = None
+
+    def run(self):
+        import websocket
+        load_numpy()
+        websocket.enableTrace(False)
+        attempt = 0
+        while self.running:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self.on_open,
+                on_message=self.on_message,
+                on_error=self.on_error,
+                on_close=self.on_close
+            )
+            # websocket-client validates UTF-8 in pure Python, which costs more than
+            # everything else on the livestream path combined; the bridge only sends JSON
+            self.ws.run_forever(skip_utf8_validation=True, ping_interval=self.ping_interval,
+                                ping_timeout=self.ping_timeout)
+            BRIDGE_CONNECTED.set(0)
+            if not self.running:
+                break
+            if self.connected:
+                # It was up: this is a fresh outage, so retry right away
+                self.connected = False
+                self.dropped_at = time.monotonic()
+                attempt = 0
+                self.hold_recordings()
+            delay = self.backoff(attempt)
+            attempt += 1
+            BRIDGE_RECONNECTS.inc()
+            self.log(f"Reconnecting in {delay:.1f}s..." if delay >= 1 else "Reconnecting...")
+            self.wakeup.wait(delay)
+
+    def backoff(self, attempt):
+        if attempt == 0:
+            return 0.0
+        return min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+    def hold_recordings(self):
+        # Give a short blip the chance to heal before the clips are closed
+        if not any(s.recording_active or s.waking or s.warm for s in self.sessions.values()):
+            return
+        self.log("Bridge lost, holding recordings...")
+        self.grace_timer = threading.Timer(self.blip_seconds, self.stop_all)
+        self.grace_timer.daemon = True
+        self.grace_timer.start()
+
+    def on_open(self, ws):
+        BRIDGE_CONNECTED.set(1)
+        self.connected = True
+        self.log("Bridge Linked.")
+        ws.send(json.dumps({"messageId": "set_schema", "command": "set_api_schema", "schemaVersion": 21}))
+        ws.send(json.dumps({"messageId": "start_listening", "command": "start_listening"}))
+        if self.dropped_at is not None:
+            BRIDGE_RECONNECT_SECONDS.observe(time.monotonic() - self.dropped_at)
+            self.dropped_at = None
+        if self.grace_timer:
+            self.grace_timer.cancel()
+            self.grace_timer = None
+        for session in list(self.sessions.values()):
+            session.resume()
+
+    def session(self, serial):
+        session = self.sessions.get(serial)
+        if session is None:
+            session = RecordingSession(
+                serial, self.record_dir, self.send_command,
+                lambda msg, s=serial: self.session_log(s, msg), self.session_motion,
+                queue_bytes=self.queue_bytes, drop_policy=self.drop_policy, **self.session_options)
+            self.sessions[serial] = session
+        return session
+
+    def on_message(self, ws, message):
+        # Hot path: livestream chunks skip the full JSON parse
+        chunk = parse_livestream(message)
+        if chunk:
+            kind, serial, payload, codec = chunk
+            if serial:
+                self.session(serial).feed(kind, payload, codec)
+            return
+
+        data = json_loads(message)
+        if data.get("type") == "event":
+            event = data.get("event", {})
+            event_type = event.get("event")
+            serial = event.get("serialNumber")
+            if not serial:
+                return
+
+            if event_type == "motion detected" and event.get("state") is True:
+                if self.on_motion:
+                    self.on_motion(serial)
+                self.session(serial).on_motion()
+
+            elif event_type == "livestream error":
+                self.session_log(serial, "P2P Error. Retrying...")
+
+            elif event_type == "livestream started":
+                self.session(serial).on_stream_started()
+
+            elif event_type in ["livestream stopped"]:
+                if serial in self.sessions:
+                    self.sessions[serial].stop_recording()
+
+    def send_command(self, payload):
+        ws = self.ws
+        if not ws:
+            return False
+        try:
+            ws.send(json.dumps(payload))
+            return True
+        except: return False
+
+    def session_log(self, serial, msg):
+        if len(self.sessions) > 1:
+            msg = f"[{serial[-4:]}] {msg}"
+        self.log(msg)
+
+    def session_motion(self, serial, active):
+        if self.recording:
+            self.recording(serial, active)
+
+    def stop_all(self):
+        for session in list(self.sessions.values()):
+            session.stop_recording()
+
+    def on_error(self, ws, error): self.log(f"Error: {error}")
+    def on_close(self, ws, a, b): pass  # recordings are held or stopped by run()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.grace_timer: self.grace_timer.cancel()
+        self.stop_all()
+        if self.ws: self.ws.close()
+        deadline = time.monotonic() + WRITER_JOIN_SECONDS
+        for session in list(self.sessions.values()):
+            session.join(max(0.0, deadline - time.monotonic()))
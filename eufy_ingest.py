@@ -0,0 +1,132 @@
+import json
+import re
+
+# Optional fast backends; everything falls back to the stdlib when they are missing.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+np = None  # see load_numpy()
+
+json_loads = orjson.loads if orjson else json.loads
+
+LIVESTREAM_EVENTS = {
+    "livestream video data": "video",
+    "livestream audio data": "audio",
+}
+
+_EVENT_RE = re.compile(r'"event"\s*:\s*"([^"]*)"')
+_SERIAL_RE = re.compile(r'"serialNumber"\s*:\s*"([^"]*)"')
+_DATA_RE = re.compile(r'"data"\s*:\s*\[')
+_CODEC_RE = re.compile(r'"videoCodec"\s*:\s*"([^"]*)"')
+VIDEO_CODECS = {"H264": "H264", "H265": "H265", "HEVC": "H265"}
+
+
+def load_numpy():
+    """Enable the numpy byte decoder if numpy is installed.
+
+    Not done at import: numpy takes longer to import than the GUI takes to
+    appear, so the websocket worker calls this from its own thread.
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np is not None
+
+
+def decode_byte_array(text):
+    # text is the inside of a JSON int array, e.g. "0,0,0,1,103"
+    if not text or text.isspace():
+        return b""
+    if np is not None:
+        # Parse wide and range-check: a uint8 parse would wrap 300 to 44, and a
+        # malformed tail stops the parse early instead of failing
+        values = np.fromstring(text, dtype=np.int64, sep=",")
+        if len(values) != text.count(",") + 1 or (values & ~0xFF).any():
+            raise ValueError("bad byte array")
+        return values.astype(np.uint8).tobytes()
+    return bytes(json_loads("[" + text + "]"))
+
+
+def parse_livestream(message):
+    """Return (kind, serial, payload, codec) for livestream data events, None for anything else.
+
+    codec is the event's metadata.videoCodec ("H264"/"H265"), None when absent or unknown.
+
+    Only the event name, serial and buffer are pulled out of the raw text; with numpy
+    installed the int array is never materialised as a Python list.
+    """
+    if isinstance(message, (bytes, bytearray)):
+        message = message.decode("utf-8", "replace")
+    m = _EVENT_RE.search(message)
+    if not m:
+        return None
+    kind = LIVESTREAM_EVENTS.get(m.group(1))
+    if kind is None:
+        return None
+    buf = message.find('"buffer"')
+    d = _DATA_RE.search(message, buf) if buf != -1 else None
+    if not d:
+        return None
+    start = d.end()
+    end = message.find("]", start)
+    if end == -1:
+        return None
+    s = _SERIAL_RE.search(message, 0, d.start()) or _SERIAL_RE.search(message, end)
+    try:
+        payload = decode_byte_array(message[start:end])
+    except ValueError:
+        return None
+    codec = None
+    if kind == "video":
+        c = _CODEC_RE.search(message, end) or _CODEC_RE.search(message, 0, d.start())
+        codec = VIDEO_CODECS.get(c.group(1).upper()) if c else None
+    return kind, (s.group(1) if s else None), payload, codec
+
+
+def legacy_parse(message):
+    # The original on_message path, kept for benchmarks and as a reference.
+    data = json.loads(message)
+    if data.get("type") != "event":
+        return None
+    event = data.get("event", {})
+    kind = LIVESTREAM_EVENTS.get(event.get("event"))
+    if kind is None:
+        return None
+    codec = VIDEO_CODECS.get(str(event.get("metadata", {}).get("videoCodec", "")).upper()) if kind == "video" else None
+    return kind, event.get("serialNumber"), bytes(event.get("buffer", {}).get("data", [])), codec
+
+
+def is_keyframe(payload, codec="H264"):
+    # Scan Annex-B start codes for SPS/IDR (H.264) or VPS/SPS/IRAP (H.265) NAL units
+    find = payload.find
+    i = find(b"\x00\x00\x01")
+    while i != -1 and i + 3 < len(payload):
+        header = payload[i + 3]
+        if codec == "H265":
+            if 16 <= (header >> 1) & 0x3F <= 21 or (header >> 1) & 0x3F in (32, 33):
+                return True
+        elif header & 0x1F in (5, 7):
+            return True
+        i = find(b"\x00\x00\x01", i + 3)
+    return False
+
+
+def sniff_codec(payload):
+    # Fallback for events without metadata.videoCodec: a guess from byte patterns.
+    # H.265 NAL headers are two bytes: forbidden bit and layer id high bit clear in
+    # the first, temporal id 1 in the second. That rules out H.264 P slices (0x41),
+    # but an H.264 header can still look like one, hence metadata first.
+    i = payload.find(b"\x00\x00\x01")
+    while i != -1 and i + 4 < len(payload):
+        header = payload[i + 3]
+        t = (header >> 1) & 0x3F
+        if header & 0x81 == 0 and payload[i + 4] == 0x01 and t in (1, 19, 20, 32, 33, 34):
+            return "H265"
+        i = payload.find(b"\x00\x00\x01", i + 3)
+    return "H264"
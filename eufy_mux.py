@@ -0,0 +1,213 @@
+import struct
+import subprocess
+
+# Recorder backends. A muxer takes (kind, payload, keyframe, ts) chunks on the
+# writer thread and owns one output file. After close(), `keyframes` lists
+# [seconds from the first video chunk, byte offset in the file] per video
+# keyframe (offset None when it can't be known), for seeking and the catalog.
+
+SIDECAR_SUFFIXES = (".jpg", ".thumb.jpg", ".keyframes.json")
+
+
+def sidecars(filepath):
+    # Files kept next to a clip: snapshot, its thumbnail, keyframe index (see eufy_recorder)
+    base = filepath.rsplit(".", 1)[0]
+    return [base + suffix for suffix in SIDECAR_SUFFIXES]
+
+
+def fragment_offsets(filepath):
+    # Byte offsets of the top-level moof boxes of a fragmented MP4
+    offsets = []
+    try:
+        with open(filepath, "rb") as f:
+            pos = 0
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                size, box = struct.unpack(">I4s", header)
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                elif size == 0:
+                    break
+                if box == b"moof":
+                    offsets.append(pos)
+                if size < 8:
+                    break
+                pos += size
+                f.seek(pos)
+    except OSError:
+        pass
+    return offsets
+
+
+class FfmpegMuxer:
+    """Today's behaviour: a fresh `ffmpeg -i pipe:0 -c copy` per clip."""
+
+    extension = ".mp4"
+
+    def __init__(self, filepath, codec="H264"):
+        self.filepath = filepath
+        self.keyframes = []
+        self.base = None
+        self.leading = False  # video before the first keyframe, which gets a fragment of its own
+        cmd = ["ffmpeg", "-y", "-i", "pipe:0", "-c", "copy", "-f", "mp4", "-movflags", "frag_keyframe+empty_moov", filepath]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.stdin = self.process.stdin
+
+    def write_chunk(self, kind, payload, keyframe, ts):
+        if kind == "video":
+            if self.base is None:
+                self.base = ts
+                self.leading = not keyframe
+            if keyframe:
+                self.keyframes.append([round(ts - self.base, 3), None])
+        self.stdin.write(payload)
+
+    def flush(self):
+        self.stdin.flush()
+
+    def close(self):
+        try:
+            self.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.kill()
+        # frag_keyframe starts a fragment at every video keyframe
+        offsets = fragment_offsets(self.filepath)[1 if self.leading else 0:]
+        if len(offsets) != len(self.keyframes):
+            return  # can't tell which fragment is which: leave the offsets unknown
+        for keyframe, offset in zip(self.keyframes, offsets):
+            keyframe[1] = offset
+
+
+def _crc32_mpeg(data):
+    crc = 0xFFFFFFFF
+    for b in data:
+        crc ^= b << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+            crc &= 0xFFFFFFFF
+    return crc
+
+
+def _pts_bytes(marker, pts):
+    pts &= (1 << 33) - 1
+    return bytes([
+        (marker << 4) | ((pts >> 29) & 0x0E) | 1,
+        (pts >> 22) & 0xFF,
+        ((pts >> 14) & 0xFE) | 1,
+        (pts >> 7) & 0xFF,
+        ((pts << 1) & 0xFE) | 1,
+    ])
+
+
+class TsMuxer:
+    """In-process MPEG-TS writer for the raw Annex-B H.264/H.265 and ADTS AAC chunks.
+
+    No process spawn and no stream probing: the first keyframe is on disk as soon
+    as the writer thread gets to it. Timestamps come from chunk arrival time.
+    Audio that isn't ADTS framed is skipped, since it can't be carried as-is.
+    """
+
+    extension = ".ts"
+    PMT_PID = 0x1000
+    VIDEO_PID = 0x100
+    AUDIO_PID = 0x101
+    PTS_OFFSET = 90000  # keeps early audio PTS positive
+
+    def __init__(self, filepath, codec="H264"):
+        self.filepath = filepath
+        self.file = open(filepath, "wb")
+        self.written = 0
+        self.keyframes = []
+        self.video_type = 0x24 if codec == "H265" else 0x1B
+        self.cc = {}
+        self.base = None
+        self.out = bytearray()
+        self.pat = self._section(0, 0x00, 1, struct.pack(">HH", 1, 0xE000 | self.PMT_PID))
+        self.pmt = self._section(self.PMT_PID, 0x02, 1, struct.pack(
+            ">HH", 0xE000 | self.VIDEO_PID, 0xF000) + struct.pack(
+            ">BHH", self.video_type, 0xE000 | self.VIDEO_PID, 0xF000) + struct.pack(
+            ">BHH", 0x0F, 0xE000 | self.AUDIO_PID, 0xF000))
+        self.tables_written = False
+
+    def _section(self, pid, table_id, ext_id, body):
+        length = 5 + len(body) + 4
+        section = struct.pack(">BHHBBB", table_id, 0xB000 | length, ext_id, 0xC1, 0, 0) + body
+        section += struct.pack(">I", _crc32_mpeg(section))
+        return pid, b"\x00" + section
+
+    def _packets(self, pid, payload, start, pcr=None, random_access=False):
+        out = self.out
+        pos = 0
+        first = True
+        while first or pos < len(payload):
+            af = None  # adaptation field body (flags, PCR, stuffing); None = no field
+            if first and (pcr is not None or random_access):
+                af = bytes([(0x40 if random_access else 0) | (0x10 if pcr is not None else 0)])
+                if pcr is not None:
+                    af += struct.pack(">IH", (pcr >> 1) & 0xFFFFFFFF, ((pcr & 1) << 15) | 0x7E00)
+            room = 184 - (1 + len(af) if af is not None else 0)
+            remaining = len(payload) - pos
+            if remaining < room:
+                # Pad the last packet through the adaptation field
+                stuff = room - remaining
+                if af is None:
+                    af = b"" if stuff == 1 else b"\x00" + b"\xff" * (stuff - 2)
+                else:
+                    af += b"\xff" * stuff
+                room = remaining
+            cc = self.cc.get(pid, 0)
+            self.cc[pid] = (cc + 1) & 0x0F
+            out += struct.pack(">BHB", 0x47, (0x4000 if first and start else 0) | pid, (0x30 if af is not None else 0x10) | cc)
+            if af is not None:
+                out.append(len(af))
+                out += af
+            out += payload[pos:pos + room]
+            pos += room
+            first = False
+
+    def write_chunk(self, kind, payload, keyframe, ts):
+        if self.base is None:
+            if kind != "video":
+                return
+            self.base = ts
+        pts = int((ts - self.base) * 90000) + self.PTS_OFFSET
+        if kind == "video":
+            if keyframe:
+                self.keyframes.append([round(ts - self.base, 3), self.written + len(self.out)])
+            if keyframe or not self.tables_written:
+                for pid, section in (self.pat, self.pmt):
+                    self._packets(pid, section, True)
+                self.tables_written = True
+            header = b"\x00\x00\x01\xe0\x00\x00\x80\x80\x05" + _pts_bytes(2, pts)
+            self._packets(self.VIDEO_PID, header + bytes(payload), True, pcr=pts - 9000, random_access=keyframe)
+        elif len(payload) > 1 and payload[0] == 0xFF and payload[1] & 0xF0 == 0xF0:
+            size = 3 + 5 + len(payload)
+            if size > 0xFFFF:
+                return
+            header = b"\x00\x00\x01\xc0" + struct.pack(">H", size) + b"\x80\x80\x05" + _pts_bytes(2, pts)
+            self._packets(self.AUDIO_PID, header + bytes(payload), True)
+
+    def flush(self):
+        if self.out:
+            self.file.write(self.out)
+            self.written += len(self.out)
+            self.out = bytearray()
+        self.file.flush()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+
+
+MUXERS = {
+    "ffmpeg": FfmpegMuxer,
+    "ts": TsMuxer,
+}
@@ -0,0 +1,504 @@
+import collections
+import json
+import os
+import threading
+import time
+
+import metrics
+from eufy_ingest import is_keyframe, sniff_codec
+from eufy_mux import MUXERS, sidecars
+from eufy_snapshot import ParameterSets
+
+WRITER_POLICIES = ("block", "drop_oldest", "drop_until_keyframe")
+
+MOTION_EVENTS = metrics.Counter("eufy_motion_events_total", "Motion events received", ("serial",))
+MOTION_TO_REQUEST = metrics.Histogram("eufy_motion_to_request_seconds", "Motion event to device.start_livestream sent", ("serial",))
+REQUEST_TO_FRAME = metrics.Histogram("eufy_request_to_first_frame_seconds", "First start_livestream request to first video frame (camera wake-up)", ("serial",))
+STREAM_RETRIES = metrics.Counter("eufy_stream_retries_total", "Livestream wake-up retries", ("serial",))
+CHUNKS = metrics.Counter("eufy_livestream_chunks_total", "Livestream chunks received", ("serial", "kind"))
+CHUNK_BYTES = metrics.Counter("eufy_livestream_bytes_total", "Livestream payload bytes received", ("serial", "kind"))
+QUEUED_BYTES = metrics.Gauge("recorder_queued_bytes", "Bytes waiting in the recording writer queue", ("serial",))
+DROPPED_CHUNKS = metrics.Counter("recorder_dropped_chunks_total", "Chunks dropped by the writer overflow policy", ("serial",))
+WRITE_SECONDS = metrics.Histogram("recorder_write_seconds", "Muxer write+flush time per drained batch", ("serial",))
+
+
+class RecordingWriter(threading.Thread):
+    """Feeds a muxer (see eufy_mux) from a byte-budgeted queue.
+
+    The websocket thread only ever calls put(); all muxing and disk/pipe I/O happens here.
+    When the queue is over budget the policy decides what gives:
+      block                - put() waits for room (ingest stalls, nothing lost)
+      drop_oldest          - evict the oldest queued non-keyframe chunks
+      drop_until_keyframe  - drop the new chunk and everything after it until the next keyframe
+    """
+
+    def __init__(self, muxer, max_bytes=8 * 1024 * 1024, policy="drop_until_keyframe", on_finish=None, serial=""):
+        super().__init__(daemon=True)
+        self.serial = serial
+        if policy not in WRITER_POLICIES:
+            raise ValueError(f"Unknown writer policy: {policy}")
+        self.muxer = muxer
+        self.opened_at = time.time()  # wall clock, for the recordings catalog
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.on_finish = on_finish
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.failed = False
+        self.skipping = False
+        self.queued_bytes = 0
+        self.peak_bytes = 0
+        self.written_bytes = 0
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+        self.writes = 0
+        self.write_time = 0.0
+        self.write_max = 0.0
+
+    def put(self, payload, keyframe=False, kind="video", ts=None):
+        size = len(payload)
+        if ts is None:
+            ts = time.monotonic()
+        with self.cond:
+            if self.closed or self.failed:
+                return False
+            if self.skipping:
+                if not keyframe:
+                    return self._drop(size)
+                self.skipping = False
+            if self.queued_bytes + size > self.max_bytes:
+                if self.policy == "block":
+                    while self.queued_bytes and self.queued_bytes + size > self.max_bytes and not (self.closed or self.failed):
+                        self.cond.wait()
+                    if self.closed or self.failed:
+                        return False
+                elif self.policy == "drop_oldest":
+                    self._evict(size)
+                elif not keyframe or size > self.max_bytes:
+                    self.skipping = True
+                    return self._drop(size)
+                else:
+                    # Everything queued predates this keyframe, so it can all go
+                    for old in self.queue:
+                        self._drop(len(old[0]))
+                    self.queue.clear()
+                    self.queued_bytes = 0
+            self.queue.append((payload, keyframe, kind, ts))
+            self.queued_bytes += size
+            self.peak_bytes = max(self.peak_bytes, self.queued_bytes)
+            self.cond.notify_all()
+        QUEUED_BYTES.set(self.queued_bytes, serial=self.serial)
+        return True
+
+    def _drop(self, size):
+        self.dropped_chunks += 1
+        self.dropped_bytes += size
+        DROPPED_CHUNKS.inc(serial=self.serial)
+        return False
+
+    def _evict(self, size):
+        # Oldest non-keyframes go first; keyframes only if nothing else is left
+        for keep_keyframes in (True, False):
+            i = 0
+            while i < len(self.queue) and self.queued_bytes + size > self.max_bytes:
+                payload, keyframe = self.queue[i][:2]
+                if keep_keyframes and keyframe:
+                    i += 1
+                    continue
+                del self.queue[i]
+                self.queued_bytes -= len(payload)
+                self._drop(len(payload))
+            if self.queued_bytes + size <= self.max_bytes:
+                return
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if not self.queue:
+                    break
+                batch = list(self.queue)
+                self.queue.clear()
+                self.queued_bytes = 0
+                self.cond.notify_all()
+            QUEUED_BYTES.set(0, serial=self.serial)
+            try:
+                t0 = time.perf_counter()
+                for payload, keyframe, kind, ts in batch:
+                    self.muxer.write_chunk(kind, payload, keyframe, ts)
+                self.muxer.flush()
+                dt = time.perf_counter() - t0
+            except Exception as e:
+                print(f"Recording Write Error: {e}")
+                with self.cond:
+                    self.failed = True
+                    self.queue.clear()
+                    self.queued_bytes = 0
+                    self.cond.notify_all()
+                break
+            WRITE_SECONDS.observe(dt, serial=self.serial)
+            self.writes += 1
+            self.write_time += dt
+            self.write_max = max(self.write_max, dt)
+            self.written_bytes += sum(len(item[0]) for item in batch)
+        try:
+            self.muxer.close()
+        except Exception as e:
+            print(f"Recording Close Error: {e}")
+        if self.on_finish:
+            self.on_finish(self)
+
+    def close(self):
+        # Non-blocking: the thread drains what is queued, closes the muxer, then calls on_finish
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "queued_bytes": self.queued_bytes,
+                "peak_queued_bytes": self.peak_bytes,
+                "written_bytes": self.written_bytes,
+                "dropped_chunks": self.dropped_chunks,
+                "dropped_bytes": self.dropped_bytes,
+                "writes": self.writes,
+                "write_latency_avg_ms": (self.write_time / self.writes * 1000) if self.writes else 0.0,
+                "write_latency_max_ms": self.write_max * 1000,
+            }
+
+
+class RecordingSession:
+    """Recording lifecycle for one camera: wake-up retries, ffmpeg muxer, writer and clip timers.
+
+    The websocket worker keeps one of these per serial number and talks to the
+    bridge/GUI through the send, log and motion callbacks, so cameras record
+    independently of each other.
+
+    A clip runs until tail_seconds after the last motion event; motion while
+    recording pushes that out, up to max_clip_seconds, after which the clip is
+    cut at the next keyframe and a new one continues. With keep_warm_seconds the
+    livestream is held open after a clip ends, buffering the current GOP, so a
+    new motion event starts recording immediately instead of re-waking the camera.
+
+    backend selects the muxer from eufy_mux.MUXERS: "ffmpeg" spawns ffmpeg per
+    clip, "ts" writes MPEG-TS in-process with no spawn or probe delay.
+
+    on_clip(serial, path, started, ended, keyframes) runs on the writer thread
+    for every finished clip (wall-clock times, see eufy_mux for keyframes); the
+    keyframes also go to a <clip>.keyframes.json file next to it.
+
+    With a SnapshotWorker in snapshots, the first IDR of each clip is handed to it
+    as soon as it arrives and becomes <clip>.jpg and <clip>.thumb.jpg;
+    on_snapshot(serial, path, thumb_path) runs on the worker thread after that.
+    """
+
+    def __init__(self, serial, record_dir, send, log, motion, queue_bytes=8 * 1024 * 1024,
+                 drop_policy="drop_until_keyframe", tail_seconds=30.0, max_clip_seconds=120.0,
+                 keep_warm_seconds=0.0, backend="ffmpeg", retry_interval=6.0, max_retries=3, on_clip=None,
+                 snapshots=None, on_snapshot=None):
+        if backend not in MUXERS:
+            raise ValueError(f"Unknown recorder backend: {backend}")
+        self.serial = serial
+        self.record_dir = record_dir
+        self.send = send
+        self.log = log
+        self.motion = motion
+        self.on_clip = on_clip
+        self.snapshots = snapshots
+        self.on_snapshot = on_snapshot
+        self.params = None  # ParameterSets, once the codec is known
+        self.snapshot_path = None  # clip still waiting for its first IDR
+        self.queue_bytes = queue_bytes
+        self.drop_policy = drop_policy
+        self.tail_seconds = tail_seconds
+        self.max_clip_seconds = max(max_clip_seconds, tail_seconds)
+        self.keep_warm_seconds = keep_warm_seconds
+        self.muxer_class = MUXERS[backend]
+        self.codec = None
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+        self.lock = threading.RLock()
+        self.writer = None
+        self.writers = []  # every writer that may still be draining, for join()
+        self.recording_active = False
+        self.waking = False
+        self.warm = False
+        self.rotate_pending = False
+        self.stopped = False  # we asked the bridge to stop; ignore trailing chunks
+        self.retry_timer = None
+        self.stop_timer = None
+        self.warm_timer = None
+        self.retries = 0
+        self.last_motion = 0.0
+        self.requested_at = None  # first start_livestream of the current wake-up
+        self.clip_started = 0.0
+        self.gop = []  # chunks since the last keyframe while warm
+        self.gop_bytes = 0
+
+    def on_motion(self):
+        MOTION_EVENTS.inc(serial=self.serial)
+        with self.lock:
+            self.last_motion = time.monotonic()
+            if self.recording_active:
+                self._schedule_stop()
+                return
+            if self.waking:
+                return
+            self.stopped = False
+            if self.warm:
+                if self.warm_timer: self.warm_timer.cancel()
+                # Stream is already flowing: start from the buffered GOP, or at the next keyframe
+                if self.gop:
+                    gop, self.gop, self.gop_bytes = self.gop, [], 0
+                    self.start_recording()
+                    for kind, payload, keyframe, ts in gop:
+                        if self.writer: self.writer.put(payload, keyframe, kind, ts)
+                        if keyframe and self.snapshot_path and self.params and self.params.update(payload):
+                            self._snapshot(payload, ts)
+                self.warm = False
+                self.motion(self.serial, True)
+                return
+            self.waking = True
+            self.retries = 0
+            self.requested_at = None
+        self.motion(self.serial, True)
+        self.log("REC: Waking Camera...")
+        self.request_stream()
+
+    def request_stream(self):
+        with self.lock:
+            if not self.send({"messageId": "trigger_live", "command": "device.start_livestream", "serialNumber": self.serial}):
+                return
+            if self.requested_at is None:
+                self.requested_at = time.monotonic()
+                MOTION_TO_REQUEST.observe(self.requested_at - self.last_motion, serial=self.serial)
+            if self.retry_timer:
+                self.retry_timer.cancel()
+            self.retry_timer = threading.Timer(self.retry_interval, self.check_retry)
+            self.retry_timer.daemon = True
+            self.retry_timer.start()
+
+    def check_retry(self):
+        with self.lock:
+            if self.recording_active or not self.waking:
+                return
+            if self.retries < self.max_retries:
+                self.retries += 1
+                STREAM_RETRIES.inc(serial=self.serial)
+                self.log(f"REC: Retry Wake Up ({self.retries}/{self.max_retries})...")
+                self.request_stream()
+                return
+            self.waking = False
+            self.retries = 0
+            self.requested_at = None
+        self.log("Camera Unreachable.")
+        self.motion(self.serial, False)
+
+    def feed(self, kind, payload, codec=None):
+        # codec: the event's metadata.videoCodec; only sniffed from the bytes when the event lacks it
+        ts = time.monotonic()
+        CHUNKS.inc(serial=self.serial, kind=kind)
+        CHUNK_BYTES.inc(len(payload), serial=self.serial, kind=kind)
+        keyframe = idr = False
+        if kind == "video":
+            requested_at = self.requested_at
+            if requested_at is not None:
+                self.requested_at = None
+                REQUEST_TO_FRAME.observe(ts - requested_at, serial=self.serial)
+            if codec:
+                self.codec = codec
+            elif self.codec is None:
+                self.codec = sniff_codec(payload)
+            keyframe = is_keyframe(payload, self.codec)
+            if keyframe and self.snapshots:
+                if self.params is None or self.params.codec != self.codec:
+                    self.params = ParameterSets(self.codec)
+                idr = self.params.update(payload)
+        if self.warm:
+            with self.lock:
+                if self.warm:
+                    self._buffer_gop(kind, payload, keyframe, ts)
+                    return
+        if kind == "video":
+            if self.rotate_pending and keyframe:
+                self._rotate()
+            elif not self.recording_active and (self.waking or (keyframe and not self.stopped)):
+                self.start_recording()
+        # Never touches the output: the writer thread owns all muxer I/O
+        writer = self.writer
+        if writer: writer.put(payload, keyframe, kind, ts)
+        if idr and writer and self.snapshot_path:
+            self._snapshot(payload, ts)
+
+    def _snapshot(self, payload, ts):
+        # Only the NAL scan happens here; ffmpeg decodes on the snapshot worker's thread
+        clip, self.snapshot_path = self.snapshot_path, None
+        jpg, thumb, _ = sidecars(clip)
+        self.snapshots.submit(self.serial, self.params.access_unit(payload), self.params.codec, jpg, thumb,
+                              self.on_snapshot, ts)
+
+    def resume(self):
+        # The bridge connection came back after a blip: ask for the livestream again if we were using it
+        with self.lock:
+            if self.waking:
+                resend = False
+            elif self.recording_active or self.warm:
+                resend = True
+            else:
+                return
+        if not resend:
+            self.request_stream()
+            return
+        self.log("REC: Resuming Stream...")
+        self.send({"messageId": "trigger_live", "command": "device.start_livestream", "serialNumber": self.serial})
+
+    def on_stream_started(self):
+        # Someone (us or the Eufy app) opened the livestream: record it again
+        self.stopped = False
+
+    def _buffer_gop(self, kind, payload, keyframe, ts):
+        if keyframe:
+            self.gop, self.gop_bytes = [], 0
+        elif not self.gop or self.gop_bytes + len(payload) > self.queue_bytes:
+            return
+        self.gop.append((kind, payload, keyframe, ts))
+        self.gop_bytes += len(payload)
+
+    def start_recording(self):
+        with self.lock:
+            if self.recording_active:
+                return
+            if self.retry_timer:
+                self.retry_timer.cancel()
+            if not self._open_clip():
+                return
+            self.recording_active = True
+            self.waking = False
+            self.last_motion = max(self.last_motion, time.monotonic() - 1.0)
+            self._schedule_stop()
+        self.log("REC: Stream Active")
+
+    def _open_clip(self):
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        filepath = os.path.join(self.record_dir, f"eufy_{self.serial}_{timestamp}{self.muxer_class.extension}")
+        try:
+            os.makedirs(self.record_dir, exist_ok=True)
+            muxer = self.muxer_class(filepath, self.codec or "H264")
+        except Exception as e:
+            print(f"Recorder Open Error: {e}")
+            return False
+        self.writer = RecordingWriter(muxer, self.queue_bytes, self.drop_policy, on_finish=self.finish_recording, serial=self.serial)
+        self.writer.start()
+        self.writers = [w for w in self.writers if w.is_alive()] + [self.writer]
+        self.clip_started = time.monotonic()
+        if self.snapshots:
+            self.snapshot_path = filepath
+        return True
+
+    def _close_clip(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    def _rotate(self):
+        # Max clip length reached with motion still going: cut on this keyframe
+        with self.lock:
+            if not self.rotate_pending:
+                return
+            self.rotate_pending = False
+            self._close_clip()
+            if not self._open_clip():
+                self.recording_active = False
+                return
+            self._schedule_stop()
+
+    def _schedule_stop(self):
+        now = time.monotonic()
+        deadline = self.last_motion + self.tail_seconds
+        if not self.rotate_pending:
+            deadline = min(deadline, self.clip_started + self.max_clip_seconds)
+        if self.stop_timer:
+            self.stop_timer.cancel()
+        self.stop_timer = threading.Timer(max(0.0, deadline - now), self._clip_timeout)
+        self.stop_timer.daemon = True
+        self.stop_timer.start()
+
+    def _clip_timeout(self):
+        with self.lock:
+            if not self.recording_active:
+                return
+            if time.monotonic() < self.last_motion + self.tail_seconds - 0.05:
+                # Still inside the motion tail, so this is the max-length cut
+                self.rotate_pending = True
+                self._schedule_stop()
+                return
+            if self.keep_warm_seconds <= 0:
+                warm = False
+            else:
+                warm = True
+                self.recording_active = False
+                self.rotate_pending = False
+                self._close_clip()
+                self.warm = True
+                self.gop, self.gop_bytes = [], 0
+                self.warm_timer = threading.Timer(self.keep_warm_seconds, self.stop_recording)
+                self.warm_timer.daemon = True
+                self.warm_timer.start()
+        if not warm:
+            self.stop_recording()
+            return
+        self.motion(self.serial, False)
+        self.log("REC: Clip Saved (stream warm)")
+
+    def stop_recording(self):
+        with self.lock:
+            was_active = self.recording_active or self.warm
+            self.retries = 0
+            self.waking = False
+            self.requested_at = None
+            self.warm = False
+            self.rotate_pending = False
+            self.gop, self.gop_bytes = [], 0
+            for timer in (self.retry_timer, self.stop_timer, self.warm_timer):
+                if timer: timer.cancel()
+            if not was_active:
+                return
+            self.stopped = True
+            was_recording = self.recording_active
+            self.recording_active = False
+            self._close_clip()
+        if was_recording:
+            self.motion(self.serial, False)
+        self.log("Standby.")
+        self.send({"messageId": "stop_live", "command": "device.stop_livestream", "serialNumber": self.serial})
+
+    def join(self, timeout=None):
+        # Wait for closed clips to finish writing (queue, muxer, sidecar, on_clip); writers are daemons
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.lock:
+            writers = list(self.writers)
+        for writer in writers:
+            writer.join(max(0.0, deadline - time.monotonic()) if deadline is not None else None)
+
+    def finish_recording(self, writer):
+        # Runs on the writer thread once the queue is drained and the muxer is closed
+        stats = writer.stats()
+        if stats["dropped_chunks"]:
+            print(f"REC {self.serial}: dropped {stats['dropped_chunks']} chunks ({stats['dropped_bytes']} bytes), "
+                  f"max write {stats['write_latency_max_ms']:.1f} ms")
+        if not stats["written_bytes"] or writer.failed:
+            return
+        muxer = writer.muxer
+        try:
+            with open(sidecars(muxer.filepath)[2], "w") as f:
+                json.dump({"codec": self.codec or "H264", "keyframes": muxer.keyframes}, f)
+        except OSError as e:
+            print(f"Keyframe index error: {e}")
+        if self.on_clip:
+            try:
+                self.on_clip(self.serial, muxer.filepath, writer.opened_at, time.time(), muxer.keyframes)
+            except Exception as e:
+                print(f"Catalog error: {e}")
@@ -0,0 +1,132 @@
+import collections
+import subprocess
+import threading
+import time
+
+import metrics
+
+# Motion snapshots without decoding the stream ourselves. The websocket thread
+# only scans keyframe chunks for their NAL unit types (cheap, no decoding) and
+# remembers the latest parameter sets; the first IDR of a clip, with SPS/PPS
+# in front, goes to SnapshotWorker, which has a one-shot ffmpeg process turn
+# it into a JPEG (plus a small thumbnail for lists and TV alerts).
+
+SNAPSHOT_SECONDS = metrics.Histogram("eufy_snapshot_seconds", "First IDR of a clip received to its JPEG on disk", ("serial",))
+
+H264_SPS, H264_PPS, H264_IDR = 7, 8, 5
+H265_VPS, H265_SPS, H265_PPS = 32, 33, 34
+H265_IRAP = range(16, 22)
+THUMB_WIDTH = 480
+
+
+def nal_units(payload, codec="H264", headers_only=False):
+    """Yield (type, start, end) per Annex-B NAL unit in payload; start is at its start code.
+
+    headers_only stops at the first slice (yielded with end = len(payload)), so
+    the picture data itself, which is most of a keyframe, is never scanned.
+    """
+    find = payload.find
+    i = find(b"\x00\x00\x01")
+    while i != -1 and i + 3 < len(payload):
+        begin = i - 1 if i and payload[i - 1] == 0 else i
+        header = payload[i + 3]
+        kind = (header >> 1) & 0x3F if codec == "H265" else header & 0x1F
+        if headers_only and is_vcl(kind, codec):
+            yield kind, begin, len(payload)
+            return
+        j = find(b"\x00\x00\x01", i + 3)
+        end = len(payload) if j == -1 else (j - 1 if payload[j - 1] == 0 else j)
+        yield kind, begin, end
+        i = j
+
+
+def is_vcl(kind, codec="H264"):
+    # Coded picture data; parameter sets always come before the first one
+    return kind < 32 if codec == "H265" else 1 <= kind <= 5
+
+
+class ParameterSets:
+    """Latest SPS/PPS (and VPS for H.265) seen on a stream."""
+
+    def __init__(self, codec="H264"):
+        self.codec = codec
+        self.sets = {}
+
+    def update(self, payload):
+        # Remember parameter sets in payload; True if it carries an IDR/IRAP picture
+        wanted = (H265_VPS, H265_SPS, H265_PPS) if self.codec == "H265" else (H264_SPS, H264_PPS)
+        for kind, start, end in nal_units(payload, self.codec, headers_only=True):
+            if kind in wanted:
+                self.sets[kind] = bytes(payload[start:end])
+            elif is_vcl(kind, self.codec):
+                return kind == H264_IDR if self.codec == "H264" else kind in H265_IRAP
+        return False
+
+    def access_unit(self, payload):
+        # payload with any parameter sets it lacks in front, so it decodes on its own
+        present = set()
+        for kind, _, _ in nal_units(payload, self.codec, headers_only=True):
+            if is_vcl(kind, self.codec):
+                break
+            present.add(kind)
+        missing = [data for kind, data in sorted(self.sets.items()) if kind not in present]
+        return b"".join(missing) + bytes(payload)
+
+
+class SnapshotWorker(threading.Thread):
+    """Decodes IDR access units to JPEG files in ffmpeg child processes, one at a time."""
+
+    def __init__(self, ffmpeg="ffmpeg", timeout=10):
+        super().__init__(daemon=True)
+        self.ffmpeg = ffmpeg
+        self.timeout = timeout
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self.running = True
+        self.available = True
+
+    def submit(self, serial, access_unit, codec, path, thumb_path=None, on_done=None, received=None):
+        # on_done(serial, path, thumb_path) runs on this thread once the files exist
+        if not self.available:
+            return
+        with self.cond:
+            self.queue.append((serial, access_unit, codec, path, thumb_path, on_done, received or time.monotonic()))
+            self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.queue.clear()
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.queue:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                serial, data, codec, path, thumb_path, on_done, received = self.queue.popleft()
+            if self.decode(data, codec, path, thumb_path):
+                SNAPSHOT_SECONDS.observe(time.monotonic() - received, serial=serial)
+                if on_done:
+                    on_done(serial, path, thumb_path)
+
+    def decode(self, data, codec, path, thumb_path=None):
+        cmd = [self.ffmpeg, "-loglevel", "error", "-y", "-f", "hevc" if codec == "H265" else "h264", "-i", "pipe:0",
+               "-frames:v", "1", "-q:v", "3", path]
+        if thumb_path:
+            cmd += ["-vf", f"scale={THUMB_WIDTH}:-2", "-frames:v", "1", "-q:v", "5", thumb_path]
+        try:
+            result = subprocess.run(cmd, input=data, capture_output=True, timeout=self.timeout)
+        except FileNotFoundError:
+            print("Snapshots disabled: ffmpeg not found")
+            self.available = False
+            return False
+        except subprocess.TimeoutExpired:
+            print("Snapshot error: ffmpeg timed out")
+            return False
+        if result.returncode != 0:
+            print(f"Snapshot error: {result.stderr.decode(errors='replace').strip()[:200]}")
+            return False
+        return True
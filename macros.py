@@ -0,0 +1,128 @@
+import math
+import re
+
+from text_entry import type_command, wait_until, WAKE_COMMAND
+
+# Macros: named step lists from the config, compiled into one shell script so
+# a whole sequence is a single ADB round-trip (one network hop, and the box
+# times the steps itself instead of us racing the network between keys).
+#   "macros": {"Netflix": {"steps": ["wake", {"launch": "Netflix"}, {"wait": "foreground", "timeout": 8},
+#                                    "down", "ok"],
+#                          "hotkey": "Ctrl+1", "button": true}}
+# Steps:
+#   "ok" / 66 / {"key": "ok"}     a key (name from KEY_NAMES or a keycode); keys in a row
+#                                 share one `input keyevent`
+#   "wake"                        WAKE_COMMAND (returns as soon as the screen is on)
+#   {"text": "..."}               type into the focused field (text_entry.type_command)
+#   {"launch": "Netflix"}         an APP_MAP name or a package id
+#   {"sleep": 0.5}                fixed pause, in seconds
+#   {"wait": "awake" | "asleep" | "keyboard" | "foreground" | "foreground <package>", "timeout": 5}
+#                                 poll the box until the state holds (or timeout); plain
+#                                 "foreground" means the app the macro last launched
+
+# Names accepted for keys in macros and on the control socket, besides raw keycodes
+KEY_NAMES = {"up": 19, "down": 20, "left": 21, "right": 22, "ok": 66, "enter": 66, "back": 4, "home": 3,
+             "del": 67, "vol+": 24, "vol-": 25, "mute": 164, "power": 26, "off": 223, "on": 224}
+
+WAIT_CHECKS = {
+    "awake": "dumpsys power | grep -q mWakefulness=Awake",
+    "asleep": "! dumpsys power | grep -q mWakefulness=Awake",
+    "keyboard": "dumpsys input_method | grep -q mInputShown=true",
+}
+FOREGROUND_CHECK = "dumpsys window | grep -E 'mFocusedApp=|mCurrentFocus=' | grep -q ' {pkg}/'"
+WAIT_TIMEOUT = 5.0
+CHECK_SECONDS = 1.0  # a wait's last dumpsys can still be running at its deadline
+LAUNCH_SECONDS = 3.0  # resolve + `am start` on a cold cache
+MAX_SECONDS = 60  # what one macro may take on the box; the ADB command timeout is sized from this
+_PACKAGE_RE = re.compile(r"^[A-Za-z][\w.]*$")
+
+
+def key_code(key):
+    if isinstance(key, int) and not isinstance(key, bool):
+        return key
+    key = str(key).lower()
+    if key in KEY_NAMES:
+        return KEY_NAMES[key]
+    if key.isdigit():
+        return int(key)
+    raise ValueError(f"unknown key: {key}")
+
+
+def key_name(code):
+    # For recorded macros: "down" reads better than 20 in the config
+    return next((name for name, c in KEY_NAMES.items() if c == code), code)
+
+
+def seconds_value(value, what):
+    # float() alone lets NaN/inf through and raises TypeError on null
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"bad {what}: {value!r}") from None
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f"bad {what}: {value!r}")
+    return seconds
+
+
+def package_name(pkg):
+    if not _PACKAGE_RE.match(pkg):
+        raise ValueError(f"bad package name: {pkg}")
+    return pkg
+
+
+def compile_macro(steps, launch):
+    """Return (script, seconds): the steps as one shell script, and the most it
+    can take on the box (waits end at a real deadline, see wait_until). launch(name) -> (command, package) resolves
+    launch steps. Raises ValueError on a bad step."""
+    parts, keys = [], []
+    seconds = 0.0
+    last_pkg = None
+    for step in steps:
+        if isinstance(step, dict) and "key" in step:
+            step = step["key"]
+        if not isinstance(step, dict) and step != "wake":
+            keys.append(key_code(step))
+            continue
+        if keys:
+            parts.append("input keyevent " + " ".join(map(str, keys)))
+            keys = []
+        if step == "wake":
+            parts.append(WAKE_COMMAND)
+            seconds += 2.0 + CHECK_SECONDS
+        elif "text" in step:
+            cmd = type_command(str(step["text"]))
+            if not cmd:
+                raise ValueError(f"nothing to type: {step['text']!r}")
+            parts.append(cmd)
+            seconds += 0.5
+        elif "launch" in step:
+            cmd, last_pkg = launch(str(step["launch"]))
+            parts.append(cmd)
+            seconds += LAUNCH_SECONDS
+        elif "sleep" in step:
+            delay = seconds_value(step["sleep"], "sleep")
+            parts.append(f"sleep {delay:g}")
+            seconds += delay
+        elif "wait" in step:
+            what = str(step["wait"])
+            timeout = seconds_value(step.get("timeout", WAIT_TIMEOUT), "timeout")
+            if what in WAIT_CHECKS:
+                check = WAIT_CHECKS[what]
+            elif what == "foreground" or what.startswith("foreground "):
+                pkg = what.split(None, 1)[1] if " " in what else last_pkg
+                if not pkg:
+                    raise ValueError("wait foreground: no app launched before it")
+                check = FOREGROUND_CHECK.format(pkg=package_name(pkg))
+            else:
+                raise ValueError(f"unknown wait: {what}")
+            parts.append(wait_until(check, timeout))
+            seconds += timeout + CHECK_SECONDS
+        else:
+            raise ValueError(f"bad macro step: {step!r}")
+    if keys:
+        parts.append("input keyevent " + " ".join(map(str, keys)))
+    if not parts:
+        raise ValueError("empty macro")
+    if seconds > MAX_SECONDS:
+        raise ValueError(f"macro waits up to {seconds:g}s, more than {MAX_SECONDS}s")
+    return "; ".join(parts), seconds
@@ -0,0 +1,151 @@
+import bisect
+import threading
+
+# Minimal Prometheus-style metrics: counters, gauges and histograms with labels,
+# rendered in the text exposition format. Cheap enough for the livestream path.
+
+REGISTRY = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _fmt(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(l, "")) for l in self.labels)
+
+    def _label_str(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines += self._render_value(key, value)
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{self._label_str(key)} {_fmt(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            h = self.values.get(key)
+            if h is None:
+                h = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+            h[3] = value  # last observation, handy for the GUI
+
+    def summary(self, **labels):
+        # {"count", "avg", "last", "p50", "p95"}; quantiles are bucket upper bounds
+        with self.lock:
+            h = self.values.get(self._key(labels))
+            if not h:
+                return None
+            counts, total, n, last = list(h[0]), h[1], h[2], h[3]
+        return {"count": n, "avg": total / n, "last": last,
+                "p50": self._quantile(counts, n, 0.5), "p95": self._quantile(counts, n, 0.95)}
+
+    def _quantile(self, counts, n, q):
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= q * n:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def _render_value(self, key, h):
+        counts, total, n = h[0], h[1], h[2]
+        lines = []
+        running = 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{self.name}_bucket{self._label_str(key, [('le', le)])} {running}")
+        lines.append(f"{self.name}_sum{self._label_str(key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{self._label_str(key)} {n}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in list(REGISTRY):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def start_http_server(port, host="127.0.0.1"):
+    # http.server is imported here so that recording metrics stays cheap to import
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
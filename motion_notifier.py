@@ -0,0 +1,122 @@
+import collections
+import threading
+import time
+
+import metrics
+
+# Motion alerts for the TVs. The bridge reports motion from the websocket
+# thread; alerts are batched and sent from this thread, never the GUI's.
+# Motion from every camera within `window` seconds of the first event goes
+# out as one alert, and a camera that alerted less than `cooldown` seconds
+# ago only bumps a counter that rides along with its next alert. The first
+# event of a window calls warm(), so the ADB connections are up by the time
+# the alert is sent. A camera's snapshot (eufy_snapshot) rides along if it is
+# ready before its alert goes out, or follows within image_window seconds as
+# a second alert carrying just the picture.
+
+ALERTS_SENT = metrics.Counter("motion_alerts_sent_total", "Motion alerts sent to the TVs")
+ALERTS_SUPPRESSED = metrics.Counter("motion_alerts_suppressed_total", "Motion events folded into an earlier alert", ("serial",))
+MOTION_TO_ALERT = metrics.Histogram("motion_to_alert_seconds", "First motion event to its alert being queued for the TVs")
+
+
+class MotionNotifier(threading.Thread):
+    def __init__(self, send, warm=None, names=None, window=0.5, cooldown=60.0, image_window=20.0):
+        super().__init__(daemon=True)
+        self.send = send  # send(title, message, image), called on this thread
+        self.warm = warm
+        self.names = names or {}  # serial -> camera name
+        self.window = window
+        self.cooldown = cooldown
+        self.image_window = image_window
+        self.cond = threading.Condition()
+        self.pending = {}  # serial -> first motion time in the current window
+        self.last_sent = {}
+        self.suppressed = collections.Counter()
+        self.seen = set()
+        self.images = {}  # serial -> snapshot for the pending alert
+        self.awaiting = {}  # serial -> time an alert went out without a picture
+        self.followups = collections.deque()
+        self.running = True
+
+    def motion(self, serial):
+        now = time.monotonic()
+        with self.cond:
+            self.seen.add(serial)
+            if now - self.last_sent.get(serial, -self.cooldown) < self.cooldown:
+                self.suppressed[serial] += 1
+                ALERTS_SUPPRESSED.inc(serial=serial)
+                return
+            if serial in self.pending:
+                return
+            first = not self.pending
+            self.pending[serial] = now
+            self.cond.notify()
+        if first and self.warm:
+            self.warm()
+
+    def snapshot(self, serial, path):
+        with self.cond:
+            if serial in self.pending:
+                self.images[serial] = path
+            elif time.monotonic() - self.awaiting.pop(serial, -self.image_window) < self.image_window:
+                self.followups.append((serial, path))
+                self.cond.notify()
+
+    def camera_name(self, serial):
+        return self.names.get(serial) or f"camera {serial[-4:]}"
+
+    def where(self, serials):
+        if not self.names and len(self.seen) == 1:
+            return "the front door"  # one unnamed camera: the wording from before names were configurable
+        return ", ".join(self.camera_name(s) for s in serials)
+
+    def message(self, serials):
+        where = self.where(serials)
+        extra = sum(self.suppressed.pop(s, 0) for s in serials)
+        return f"Motion detected at {where}!" + (f" (+{extra} since the last alert)" if extra else "")
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.pending and not self.followups:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                if self.followups:
+                    serial, image = self.followups.popleft()
+                    text = f"Snapshot from {self.where([serial])}"
+                else:
+                    image = None
+                    due = min(self.pending.values()) + self.window
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        self.cond.wait(delay)
+                        continue
+                    batch, self.pending = self.pending, {}
+                    now = time.monotonic()
+                    for serial in sorted(batch):
+                        self.last_sent[serial] = now
+                        path = self.images.pop(serial, None)
+                        if path is None:
+                            self.awaiting[serial] = now
+                        elif image is None:
+                            image = path
+                        else:
+                            # One picture per alert: the others follow right behind it
+                            self.followups.append((serial, path))
+                    self.images.clear()
+                    text = self.message(sorted(batch))
+                    MOTION_TO_ALERT.observe(now - min(batch.values()))
+                    ALERTS_SENT.inc()
+            self._send("SECURITY ALERT", text, image)
+
+    def _send(self, title, text, image=None):
+        try:
+            self.send(title, text, image)
+        except Exception as e:
+            print(f"Alert error: {e}")
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
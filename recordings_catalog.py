@@ -0,0 +1,226 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import metrics
+from eufy_mux import sidecars
+
+# SQLite index of the clips in the recordings folder. Clips are added as the
+# recorder closes them (camera, wall-clock start/end, size, keyframe offsets
+# from eufy_mux), so "clips from camera X in the last hour" is an indexed
+# query instead of a directory listing. A background thread applies the
+# retention rules: clips older than max_age_days go, then the oldest clips
+# until the folder fits in max_bytes.
+
+CATALOG_BYTES = metrics.Gauge("recordings_bytes", "Bytes of recordings in the catalog")
+CATALOG_CLIPS = metrics.Gauge("recordings_clips", "Recordings in the catalog")
+EVICTED = metrics.Counter("recordings_evicted_total", "Recordings deleted by retention", ("reason",))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path TEXT PRIMARY KEY,
+    serial TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    duration REAL NOT NULL,
+    bytes INTEGER NOT NULL,
+    keyframes TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS recordings_serial_started ON recordings (serial, started);
+CREATE INDEX IF NOT EXISTS recordings_started ON recordings (started);
+"""
+
+# eufy_<serial>_<YYYYmmdd-HHMMSS>.<ext>; clips from before per-camera sessions have no serial
+CLIP_RE = re.compile(r"^eufy_(?:(.+)_)?(\d{8}-\d{6})\.(mp4|ts)$")
+SETTLE_SECONDS = 600  # files modified more recently than this may still be recording
+
+
+class RecordingsCatalog(threading.Thread):
+    def __init__(self, record_dir, db_path=None, max_age_days=0, max_bytes=0, interval=600):
+        super().__init__(daemon=True)
+        self.record_dir = record_dir
+        self.db_path = db_path or os.path.join(record_dir, "recordings.db")
+        self.max_age_days = max_age_days  # 0 = keep forever
+        self.max_bytes = max_bytes        # 0 = no quota
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.cond = threading.Condition()
+        self.db = None
+        self.running = True
+        self.dirty = False  # a new clip may have pushed us over the quota
+
+    def _conn(self):
+        # Call with self.lock held
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.db.row_factory = sqlite3.Row
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+        return self.db
+
+    # --- any thread ---
+
+    def add(self, serial, path, started, ended, keyframes=()):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self.lock:
+            db = self._conn()
+            with db:
+                db.execute("INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (path, serial, started, ended, max(0.0, ended - started), size, json.dumps(list(keyframes))))
+            self._update_gauges(db)
+        if self.max_bytes:
+            with self.cond:
+                self.dirty = True
+                self.cond.notify()
+
+    def query(self, serial=None, since=None, until=None, limit=None):
+        """Clips newest first, as dicts; keyframes decoded to [[seconds, offset], ...],
+        snapshot is the clip's thumbnail JPEG or None."""
+        sql, args = "SELECT * FROM recordings WHERE 1", []
+        if serial:
+            sql += " AND serial = ?"; args.append(serial)
+        if since is not None:
+            sql += " AND started >= ?"; args.append(since)
+        if until is not None:
+            sql += " AND started < ?"; args.append(until)
+        sql += " ORDER BY started DESC"
+        if limit:
+            sql += " LIMIT ?"; args.append(int(limit))
+        with self.lock:
+            rows = self._conn().execute(sql, args).fetchall()
+        clips = []
+        for row in rows:
+            clip = dict(row)
+            clip["keyframes"] = json.loads(clip["keyframes"])
+            thumb = sidecars(clip["path"])[1]
+            clip["snapshot"] = thumb if os.path.exists(thumb) else None
+            clips.append(clip)
+        return clips
+
+    def serials(self):
+        with self.lock:
+            return [row[0] for row in self._conn().execute("SELECT DISTINCT serial FROM recordings ORDER BY serial")]
+
+    def totals(self):
+        with self.lock:
+            count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM recordings").fetchone()
+        return {"clips": count, "bytes": size}
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+
+    # --- catalog thread ---
+
+    def run(self):
+        try:
+            self.scan()
+        except Exception as e:
+            print(f"Catalog scan error: {e}")
+        while True:
+            try:
+                self.enforce()
+            except Exception as e:
+                print(f"Retention error: {e}")
+            with self.cond:
+                if self.running and not self.dirty:
+                    self.cond.wait(self.interval)
+                self.dirty = False
+                if not self.running:
+                    break
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def scan(self):
+        # Pick up clips recorded before the catalog existed, forget ones deleted by hand
+        try:
+            names = os.listdir(self.record_dir)
+        except OSError:
+            names = []
+        with self.lock:
+            known = {row[0] for row in self._conn().execute("SELECT path FROM recordings")}
+        found = set()
+        now = time.time()
+        for name in names:
+            match = CLIP_RE.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.record_dir, name)
+            found.add(path)
+            if path in known:
+                continue
+            try:
+                ended = os.path.getmtime(path)
+            except OSError:
+                continue
+            if now - ended < SETTLE_SECONDS:
+                continue  # the recorder adds it when the clip closes
+            started = time.mktime(time.strptime(match.group(2), "%Y%m%d-%H%M%S"))
+            self.add(match.group(1) or "", path, started, max(started, ended))
+        gone = known - found
+        if gone:
+            with self.lock:
+                db = self._conn()
+                with db:
+                    db.executemany("DELETE FROM recordings WHERE path = ?", [(path,) for path in gone])
+                self._update_gauges(db)
+
+    def enforce(self):
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            with self.lock:
+                old = [row[0] for row in self._conn().execute(
+                    "SELECT path FROM recordings WHERE ended < ?", (cutoff,))]
+            self._evict(old, "age")
+        if self.max_bytes:
+            with self.lock:
+                db = self._conn()
+                total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM recordings").fetchone()[0]
+                victims = []
+                if total > self.max_bytes:
+                    for path, size in db.execute("SELECT path, bytes FROM recordings ORDER BY started"):
+                        victims.append(path)
+                        total -= size
+                        if total <= self.max_bytes:
+                            break
+            self._evict(victims, "quota")
+
+    def _evict(self, paths, reason):
+        removed = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Retention error: {e}")
+                continue
+            removed.append(path)
+            EVICTED.inc(reason=reason)
+            for extra in sidecars(path):
+                try:
+                    os.remove(extra)
+                except OSError:
+                    pass
+        if not removed:
+            return
+        with self.lock:
+            db = self._conn()
+            with db:
+                db.executemany("DELETE FROM recordings WHERE path = ?", [(path,) for path in removed])
+            self._update_gauges(db)
+
+    def _update_gauges(self, db):
+        count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM recordings").fetchone()
+        CATALOG_CLIPS.set(count)
+        CATALOG_BYTES.set(size)
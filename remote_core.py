@@ -0,0 +1,395 @@
+import json
+import os
+import threading
+
+import metrics
+from adb_executor import COMMAND_SECONDS
+from app_launcher import AppLauncher
+from control_socket import ControlServer, socket_path
+from eufy_bridge import EufyBridge, BRIDGE_CONNECTED
+from eufy_recorder import CHUNKS, CHUNK_BYTES, QUEUED_BYTES, WRITE_SECONDS, REQUEST_TO_FRAME
+from eufy_snapshot import SnapshotWorker
+from macros import compile_macro, key_code, package_name
+from motion_notifier import MotionNotifier
+from recordings_catalog import RecordingsCatalog
+from text_entry import type_command, clear_command, quote, WAKE_COMMAND, CLEAR_KEYS
+from tv_registry import TvRegistry, tv_entries, ALL
+
+# Everything the remote does that isn't a widget: the TVs, the Eufy bridge and
+# recorder, alerts, the recordings catalog, metrics and the control socket.
+# remote_gui.py puts a window on top of it; remote_daemon.py runs it headless.
+
+CONFIG_FILE = os.path.expanduser("~/.onn_remote_config.json")
+RECORD_DIR = os.path.expanduser("~/Videos/Eufy_Records")  # created with the first clip
+DEFAULT_IP = "192.168.50.94"
+
+# name -> (package, fallback command if the package's launcher activity can't be resolved)
+APP_MAP = {
+    "Netflix": ("com.netflix.ninja", "am start -n com.netflix.ninja/.MainActivity"),
+    "Hulu": ("com.hulu.livingroomplus", "am start -a android.intent.action.MAIN -c android.intent.category.LEANBACK_LAUNCHER -p com.hulu.livingroomplus"),
+    "YouTube": ("com.google.android.youtube.tv", "am start -a android.intent.action.MAIN -c android.intent.category.LEANBACK_LAUNCHER -p com.google.android.youtube.tv"),
+    "Prime": ("com.amazon.amazonvideo.livingroom", "monkey -p com.amazon.amazonvideo.livingroom 1 || am start -n com.amazon.amazonvideo.livingroom/com.amazon.ignition.IgnitionActivity")
+}
+
+# Keys that (may) take the TV away from the current app: HOME, BACK, POWER, SLEEP, WAKEUP
+LEAVE_APP_KEYS = (3, 4, 26, 223, 224)
+POWER_KEYS = (26, 223, 224)  # these also change the screen state
+FOREGROUND_MAX_AGE = 10  # seconds a remembered foreground package is trusted
+SCREEN_MAX_AGE = 15  # likewise for the screen power state
+SCREEN_LABELS = {"Awake": "On", "Asleep": "Off", "Dozing": "Standby", "Dreaming": "Screensaver"}
+NOTIFY_TIMEOUT = 5  # seconds per TV; an alert that can't go out by then is dropped
+STATS_KINDS = ("key", "launch", "search", "text", "clear", "wake", "macro", "notify")
+MACRO_SLACK = 10  # seconds on top of a macro's own waits before its ADB command times out
+ALERT_HTTP_PORT = 7676  # the notification app's HTTP API, the only way to hand it a picture
+
+
+def post_notification(ip, title, msg, image, port=ALERT_HTTP_PORT, timeout=NOTIFY_TIMEOUT):
+    # Same fields as the am broadcast in send_alert, plus the JPEG as the "filename" part
+    # urllib and uuid are imported here: only picture alerts need them, and they
+    # cost more at start-up than the rest of this module
+    import urllib.request
+    import uuid
+    boundary = uuid.uuid4().hex
+    body = b""
+    for name, value in (("title", title), ("msg", msg), ("type", 2), ("duration", 8), ("position", 2)):
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    with open(image, "rb") as f:
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="filename"; filename="snapshot.jpg"\r\n'
+                 'Content-Type: image/jpeg\r\n\r\n').encode() + f.read() + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    req = urllib.request.Request(f"http://{ip}:{port}/", data=body,
+                                 headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    urllib.request.urlopen(req, timeout=timeout).close()
+
+
+def load_config():
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                return json.load(f)
+        except: pass
+    return {}
+
+
+def app_name(pkg):
+    return next((name for name, (p, _) in APP_MAP.items() if p == pkg), pkg.rsplit(".", 1)[-1])
+
+
+class RemoteCore:
+    """The remote's services, usable from any thread.
+
+    on_status(name, online), on_state(snapshot), on_recording(serial, active),
+    on_log(msg) and on_snapshot(serial, path, thumb_path) are called on the
+    worker threads that produce them.
+    """
+
+    def __init__(self, config, on_status=None, on_state=None, on_recording=None, on_log=None, on_snapshot=None):
+        self.config = config
+        self.on_status = on_status
+        self.on_recording = on_recording
+        self.on_log = on_log
+        self.on_snapshot = on_snapshot
+        self.lock = threading.RLock()  # config and launcher cache
+        # ADB transport: exec (new shell per command) / session (one persistent shell) / monkey
+        self.tvs = TvRegistry(tv_entries(config, DEFAULT_IP), mode=config.get("adb_mode", "session"),
+                              on_status=self.adb_status, on_result=self.adb_result, on_state=on_state)
+        self.target = config.get("active_tv", next(iter(self.tvs.devices)))  # TV, group or ALL
+        self.alert_group = config.get("alert_group", ALL)
+        self.launcher = AppLauncher(config.setdefault("app_cache", {}))
+        self.active_cameras = set()
+        self.last_typed = 0
+        self.last_log = ""
+        # Motion alerts are batched and sent off the bridge thread, straight from its events
+        self.notifier = MotionNotifier(self.send_alert, warm=self.warm_alert_tvs,
+                                       names=config.get("camera_names"),
+                                       window=config.get("alert_window_seconds", 0.5),
+                                       cooldown=config.get("alert_cooldown_seconds", 60))
+        # First IDR of every clip -> <clip>.jpg, decoded by ffmpeg off the bridge thread
+        self.snapshots = SnapshotWorker(config.get("ffmpeg", "ffmpeg")) if config.get("rec_snapshots", True) else None
+        self.alert_image_port = config.get("alert_image_port", ALERT_HTTP_PORT)  # 0 = text-only alerts
+        # Clip index and retention (0 = off); the first scan and eviction run on its own thread
+        self.catalog = RecordingsCatalog(RECORD_DIR, max_age_days=config.get("rec_retention_days", 0),
+                                         max_bytes=int(config.get("rec_quota_gb", 0) * 1e9))
+        # Recording queue: budget in MB and policy (block / drop_oldest / drop_until_keyframe).
+        # Clip length: tail after the last motion, hard cap per file, and how long to hold the stream
+        # open afterwards. Backend: ffmpeg (process per clip) or ts (in-process MPEG-TS writer).
+        self.bridge = EufyBridge(
+            RECORD_DIR, int(config.get("rec_queue_mb", 8) * 1024 * 1024),
+            config.get("rec_drop_policy", "drop_until_keyframe"),
+            url=config.get("bridge_url", "ws://127.0.0.1:3000"), log=self.bridge_log,
+            recording=self.recording, on_motion=self.notifier.motion, on_clip=self.catalog.add,
+            tail_seconds=config.get("rec_tail_seconds", 30), max_clip_seconds=config.get("rec_max_clip_seconds", 120),
+            keep_warm_seconds=config.get("rec_keep_warm_seconds", 0), backend=config.get("rec_backend", "ffmpeg"),
+            ping_interval=config.get("bridge_ping_seconds", 5), blip_seconds=config.get("bridge_blip_seconds", 15),
+            snapshots=self.snapshots, on_snapshot=self.snapshot)
+        self.control = None
+
+    def start(self):
+        self.tvs.start()
+        self.notifier.start()
+        self.catalog.start()
+        if self.snapshots:
+            self.snapshots.start()
+        self.bridge.start()
+        # Prometheus text endpoint on localhost (0 disables)
+        port = self.config.get("metrics_port", 9470)
+        if port:
+            try:
+                metrics.start_http_server(port)
+            except OSError as e:
+                print(f"Metrics endpoint error: {e}")
+        # Commands from remote_ctl.py and scripts ("" disables)
+        path = self.config.get("control_socket", socket_path())
+        if path:
+            try:
+                self.control = ControlServer(self.execute, os.path.expanduser(path))
+                self.control.start()
+            except OSError as e:
+                print(f"Control socket error: {e}")
+
+    def stop(self):
+        if self.control:
+            self.control.stop()
+        self.bridge.stop()
+        self.bridge.join(2)
+        self.notifier.stop()
+        if self.snapshots:
+            self.snapshots.stop()
+        self.catalog.stop()
+        self.tvs.stop()
+
+    def save(self):
+        # Keep keys we don't manage here (hand-edited options) intact
+        with self.lock:
+            self.config["active_tv"] = self.target
+            if "tvs" not in self.config:
+                self.config["ip"] = self.tv().ip
+            try:
+                with open(CONFIG_FILE, 'w') as f:
+                    json.dump(self.config, f, indent=2)
+            except Exception as e: print(f"Save error: {e}")
+
+    # --- TV commands; target is a TV, a group or ALL (default: the selected one) ---
+
+    def tv(self, target=None):
+        # The selected TV, or the first of the selected group
+        return self.tvs.select(target or self.target)[0]
+
+    def key(self, code, target=None):
+        for tv in self.tvs.select(target or self.target):
+            tv.adb.key(code)
+            if code in POWER_KEYS:
+                tv.state.forget("foreground", "screen")
+            elif code in LEAVE_APP_KEYS:
+                tv.state.forget("foreground")
+
+    def type_text(self, text, target=None):
+        cmd = type_command(text)
+        if not cmd:
+            return  # nothing `input text` can type (e.g. only emoji); an empty script breaks the shell
+        self.tvs.broadcast(cmd, target or self.target, kind="text")
+        self.last_typed = max(self.last_typed, len(text))
+
+    def clear_text(self, target=None):
+        # Enough DELs for the longest thing we typed since the last clear
+        self.tvs.broadcast(clear_command(max(CLEAR_KEYS, self.last_typed)), target or self.target, kind="clear")
+        self.last_typed = 0
+
+    def search(self, text, target=None):
+        for tv in self.tvs.broadcast(f'am start -a android.search.action.GLOBAL_SEARCH --es query {quote(text)}',
+                                     target or self.target, kind="search"):
+            tv.state.forget("foreground")
+
+    def wake(self, target=None):
+        for tv in self.tvs.broadcast(WAKE_COMMAND, target or self.target, kind="wake",
+                                     skip=lambda tv: tv.state.get("screen", SCREEN_MAX_AGE) == "Awake"):
+            tv.state.forget("screen")
+
+    def launch(self, name, target=None):
+        pkg, fallback = APP_MAP[name]
+        for tv in self.tvs.select(target or self.target):
+            if tv.state.get("foreground", FOREGROUND_MAX_AGE) != pkg:
+                with self.lock:
+                    cmd = self.launcher.command(pkg, fallback)
+                tv.adb.shell(cmd, tag=f"launch:{pkg}", kind="launch")
+
+    def macros(self):
+        with self.lock:
+            return dict(self.config.get("macros", {}))
+
+    def macro(self, name, target=None):
+        macro = self.macros().get(name)
+        if macro is None:
+            raise ValueError(f"unknown macro: {name}")
+        self.run_macro(macro.get("steps", []) if isinstance(macro, dict) else macro, target)
+
+    def run_macro(self, steps, target=None):
+        # The whole macro is one script: one round-trip per TV, timed on the box
+        script, seconds = compile_macro(steps, self.macro_launch)
+        for tv in self.tvs.broadcast(script, target or self.target, kind="macro", timeout=seconds + MACRO_SLACK):
+            tv.state.forget("foreground", "screen")
+
+    def macro_launch(self, name):
+        if name in APP_MAP:
+            pkg, fallback = APP_MAP[name]
+        else:
+            pkg = package_name(name)
+            fallback = f"monkey -p {pkg} -c android.intent.category.LEANBACK_LAUNCHER 1"
+        with self.lock:
+            return self.launcher.command(pkg, fallback), pkg
+
+    def save_macro(self, name, steps):
+        compile_macro(steps, self.macro_launch)  # refuse anything that wouldn't run
+        with self.lock:
+            macros = self.config.setdefault("macros", {})
+            old = macros.get(name)
+            macros[name] = dict(old, steps=steps) if isinstance(old, dict) else {"steps": steps}
+        self.save()
+
+    def add_tv(self, name, ip):
+        with self.lock:
+            # The legacy single "ip" becomes the first entry of the list
+            self.config["tvs"] = [tv.entry for tv in self.tvs.devices.values()] + [{"name": name, "ip": ip}]
+            self.tvs.add(self.config["tvs"][-1])
+        self.save()
+
+    # --- alerts (notifier thread) ---
+
+    def send_alert(self, title, msg, image=None):
+        cmd = (
+            'am broadcast -a de.cyberdream.androidtv.notifications.google.SEND '
+            f'--es title {quote(title)} '
+            f'--es msg {quote(msg)} '
+            '--ei type 2 '
+            '--ei duration 8 '
+            '--ei position 2'
+        )
+        # Every TV in the alert group at once; nobody sees an overlay on a TV that is off
+        skip = lambda tv: tv.state.get("screen", SCREEN_MAX_AGE) in ("Asleep", "Dozing")
+        if not (image and self.alert_image_port):
+            self.tvs.broadcast(cmd, self.alert_group, kind="notify", timeout=NOTIFY_TIMEOUT, skip=skip)
+            return
+        for tv in self.tvs.select(self.alert_group):
+            if not skip(tv):
+                threading.Thread(target=self.post_alert, args=(tv, cmd, title, msg, image), daemon=True).start()
+
+    def post_alert(self, tv, cmd, title, msg, image):
+        try:
+            post_notification(tv.ip, title, msg, image, self.alert_image_port)
+        except OSError as e:
+            # App too old for the HTTP API, or it's disabled: the text still goes out over ADB
+            print(f"Alert image error ({tv.name}): {e}")
+            tv.adb.shell(cmd, kind="notify", timeout=NOTIFY_TIMEOUT)
+
+    def warm_alert_tvs(self):
+        for tv in self.tvs.select(self.alert_group):
+            tv.adb.warm()
+
+    # --- callbacks from the executor and bridge threads ---
+
+    def adb_status(self, name, online):
+        tv = self.tvs.devices.get(name)
+        if tv:
+            tv.state.update(online=online)
+        if self.on_status:
+            self.on_status(name, online)
+
+    def adb_result(self, name, tag, output):
+        tv = self.tvs.devices.get(name)
+        if tv and tag.startswith("launch:"):
+            pkg = tag[len("launch:"):]
+            with self.lock:
+                changed = self.launcher.handle_result(pkg, output)
+            if self.launcher.started(output):
+                tv.state.update(foreground=pkg)
+            if changed:
+                self.save()
+
+    def recording(self, serial, active):
+        # The light stays on while any camera is active
+        if active: self.active_cameras.add(serial)
+        else: self.active_cameras.discard(serial)
+        if self.on_recording:
+            self.on_recording(serial, active)
+
+    def snapshot(self, serial, path, thumb_path):
+        self.notifier.snapshot(serial, thumb_path)
+        if self.on_snapshot:
+            self.on_snapshot(serial, path, thumb_path)
+
+    def bridge_log(self, msg):
+        self.last_log = msg
+        if self.on_log:
+            self.on_log(msg)
+
+    # --- reporting ---
+
+    def status(self, target=None):
+        tvs = []
+        for tv in self.tvs.select(target or ALL):
+            state = tv.state.snapshot()
+            if state.get("foreground"):
+                state["app"] = app_name(state["foreground"])
+            tvs.append(dict(state, name=tv.name, ip=tv.ip))
+        return {"target": self.target, "tvs": tvs, "bridge": {"connected": bool(BRIDGE_CONNECTED.get()), "status": self.last_log},
+                "recording": sorted(self.active_cameras)}
+
+    def stats(self, recordings=True):
+        # recordings=False skips the catalog query, for callers on the GUI thread
+        cameras = {}
+        for serial in sorted(self.bridge.sessions):
+            write = WRITE_SECONDS.summary(serial=serial)
+            wake = REQUEST_TO_FRAME.summary(serial=serial)
+            cameras[serial] = {"frames": CHUNKS.get(serial=serial, kind="video"),
+                               "bytes": CHUNK_BYTES.get(serial=serial, kind="video"),
+                               "queued_bytes": QUEUED_BYTES.get(serial=serial),
+                               "write_p95_ms": write["p95"] * 1000 if write else None,
+                               "wake_s": wake["last"] if wake else None}
+        adb = {}
+        for kind in STATS_KINDS:
+            summary = COMMAND_SECONDS.summary(kind=kind)
+            if summary:
+                adb[kind] = summary["p50"] * 1000
+        stats = {"cameras": cameras, "adb_p50_ms": adb}
+        if recordings:
+            stats["recordings"] = self.catalog.totals()
+        return stats
+
+    # --- control socket ---
+
+    def execute(self, command, args=(), tv=None):
+        """Run one control-socket command; raises ValueError for bad input."""
+        target = tv or None
+        if target and target != ALL and target not in self.tvs.devices and target not in self.tvs.groups():
+            raise ValueError(f"unknown TV or group: {target}")
+        if command == "key":
+            if not args:
+                raise ValueError("key needs a keycode or name")
+            codes = [key_code(arg) for arg in args]
+            for code in codes:
+                self.key(code, target)
+        elif command in ("text", "search"):
+            text = " ".join(str(arg) for arg in args)
+            if not text:
+                raise ValueError(f"{command} needs some text")
+            (self.type_text if command == "text" else self.search)(text, target)
+        elif command == "clear":
+            self.clear_text(target)
+        elif command == "wake":
+            self.wake(target)
+        elif command == "launch":
+            name = next((n for n in APP_MAP if args and n.lower() == str(args[0]).lower()), None)
+            if name is None:
+                raise ValueError(f"launch needs one of: {', '.join(APP_MAP)}")
+            self.launch(name, target)
+        elif command == "macro":
+            if not args:
+                return sorted(self.macros())
+            self.macro(" ".join(str(arg) for arg in args), target)
+        elif command == "status":
+            return self.status(target)
+        elif command == "stats":
+            return self.stats()
+        else:
+            raise ValueError(f"unknown command: {command}")
+        return None
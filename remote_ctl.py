@@ -0,0 +1,39 @@
+import sys
+
+from control_socket import request
+
+USAGE = """usage: remote_ctl.py [--tv NAME] COMMAND [ARGS...]
+
+  key CODE|NAME...   keycodes or up/down/left/right/ok/back/home/del/vol+/vol-/mute/power/off/on
+  text TEXT          type into the focused text box
+  clear              clear the text box
+  search TEXT        Google TV global search
+  launch APP         Netflix, Hulu, YouTube or Prime
+  wake               turn the screen on
+  macro [NAME]       run a macro from the config (no NAME: list them)
+  status             TVs, bridge and recording state (JSON)
+  stats              camera and ADB latency figures (JSON)
+
+Talks to a running remote_gui.py or remote_daemon.py over its control socket."""
+
+
+def main(argv):
+    tv = None
+    if len(argv) > 1 and argv[0] == "--tv":
+        tv, argv = argv[1], argv[2:]
+    if not argv or argv[0] in ("-h", "--help"):
+        print(USAGE)
+        return 0 if argv else 2
+    try:
+        result = request(argv[0], argv[1:], tv=tv)
+    except (OSError, RuntimeError) as e:
+        print(f"remote_ctl: {e}", file=sys.stderr)
+        return 1
+    if result is not None:
+        import json
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
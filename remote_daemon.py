@@ -0,0 +1,28 @@
+import signal
+import sys
+import threading
+
+from remote_core import RemoteCore, load_config
+
+# The remote without a window: TV control, the Eufy recorder, alerts and the
+# recordings catalog, driven through the control socket (see remote_ctl.py).
+# Needs no display and never imports Qt.
+#
+#   python remote_daemon.py
+
+
+def main():
+    core = RemoteCore(load_config(), on_log=lambda msg: print(f"Bridge: {msg}", flush=True))
+    done = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *args: done.set())
+    core.start()
+    if core.control:
+        print(f"Listening on {core.control.path}", flush=True)
+    done.wait()
+    core.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
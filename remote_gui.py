@@ -1,42 +1,38 @@
+import time
+STARTUP_T0 = time.perf_counter()
 import sys
-import subprocess
-import json
 import os
-import time
-import threading
-import websocket
+import metrics
+from tv_registry import ALL
+from spell_service import SpellService
+from remote_core import RemoteCore, load_config, APP_MAP, SCREEN_LABELS, app_name
+from macros import key_name
 from PyQt6.QtWidgets import (QApplication, QWidget, QPushButton, QGridLayout, 
-                             QVBoxLayout, QLabel, QHBoxLayout, QInputDialog, QLineEdit, QMenu,
-                             QSystemTrayIcon, QStyle)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QIcon
+                             QVBoxLayout, QLabel, QHBoxLayout, QInputDialog, QLineEdit, QMenu, QCompleter,
+                             QSystemTrayIcon, QStyle, QDialog, QComboBox, QListWidget, QListWidgetItem)
+from PyQt6.QtCore import Qt, QTimer, QStringListModel, QUrl, QSize, pyqtSignal
+from PyQt6.QtGui import QIcon, QActionGroup, QDesktopServices, QPixmap, QKeySequence, QShortcut
 
 # Silence the accessibility warning in the terminal
 os.environ["QT_LINUX_ACCESSIBILITY_ALWAYS_ON"] = "0"
 
-try:
-    from ppadb.client import Client as AdbClient
-except ImportError:
-    print("Error: adb-shell/pure-python-adb not found. Run: pip install pure-python-adb")
+STARTUP_SECONDS = metrics.Gauge("app_startup_seconds", "Seconds from process start to each start-up phase", ("phase",))
+STARTUP_PHASES = []
 
-try:
-    from spellchecker import SpellChecker
-    spell = SpellChecker()
-except ImportError:
-    spell = None
 
-CONFIG_FILE = os.path.expanduser("~/.onn_remote_config.json")
-RECORD_DIR = os.path.expanduser("~/Videos/Eufy_Records")
+def mark_startup(phase):
+    t = time.perf_counter() - STARTUP_T0
+    STARTUP_PHASES.append((phase, t))
+    STARTUP_SECONDS.set(t, phase=phase)
 
-if not os.path.exists(RECORD_DIR):
-    os.makedirs(RECORD_DIR)
 
-APP_MAP = {
-    "Netflix": "am start -n com.netflix.ninja/.MainActivity",
-    "Hulu": "am start -a android.intent.action.MAIN -c android.intent.category.LEANBACK_LAUNCHER -p com.hulu.livingroomplus",
-    "YouTube": "am start -a android.intent.action.MAIN -c android.intent.category.LEANBACK_LAUNCHER -p com.google.android.youtube.tv",
-    "Prime": "monkey -p com.amazon.amazonvideo.livingroom 1 || am start -n com.amazon.amazonvideo.livingroom/com.amazon.ignition.IgnitionActivity"
-}
+def startup_report():
+    parts, last = [], 0.0
+    for phase, t in STARTUP_PHASES:
+        parts.append(f"{phase} {(t - last) * 1000:.0f} ms")
+        last = t
+    return f"Startup: {', '.join(parts)} (total {last * 1000:.0f} ms)"
+
 
 class HistoryLineEdit(QLineEdit):
     def __init__(self, *args, **kwargs):
@@ -67,167 +63,119 @@ class HistoryLineEdit(QLineEdit):
         else:
             super().keyPressEvent(event)
 
-class EufyWebsocketWorker(QThread):
-    motion_signal = pyqtSignal(bool)
-    log_signal = pyqtSignal(str)
-
-    def __init__(self):
-        super().__init__()
-        self.ws = None
-        self.running = True
-        self.ffmpeg_process = None
-        self.recording_active = False
-        self.serial_number = None
-        self.retry_timer = None
-        self.stop_timer = None
-        self.retries = 0
-
-    def run(self):
-        websocket.enableTrace(False)
-        while self.running:
-            self.ws = websocket.WebSocketApp(
-                "ws://127.0.0.1:3000",
-                on_open=self.on_open,
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_close=self.on_close
-            )
-            self.ws.run_forever()
-            if self.running:
-                self.log_signal.emit("Reconnecting...")
-                time.sleep(5)
-
-    def on_open(self, ws):
-        self.log_signal.emit("Bridge Linked.")
-        ws.send(json.dumps({"messageId": "set_schema", "command": "set_api_schema", "schemaVersion": 21}))
-        ws.send(json.dumps({"messageId": "start_listening", "command": "start_listening"}))
-
-    def on_message(self, ws, message):
-        data = json.loads(message)
-        if data.get("type") == "event":
-            event = data.get("event", {})
-            event_type = event.get("event")
-            
-            if event_type == "motion detected" and event.get("state") is True:
-                self.serial_number = event.get("serialNumber")
-                if not self.recording_active:
-                    self.retries = 0
-                    self.motion_signal.emit(True)
-                    self.log_signal.emit("REC: Waking Camera...")
-                    self.request_stream()
-
-            elif event_type == "livestream video data":
-                if not self.recording_active:
-                    self.start_recording_process()
-                if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-                    video_bytes = bytes(event.get("buffer", {}).get("data", []))
-                    self.ffmpeg_process.stdin.write(video_bytes)
-                    self.ffmpeg_process.stdin.flush()
-
-            elif event_type == "livestream audio data":
-                if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-                    audio_bytes = bytes(event.get("buffer", {}).get("data", []))
-                    self.ffmpeg_process.stdin.write(audio_bytes)
-                    self.ffmpeg_process.stdin.flush()
-
-            elif event_type == "livestream error":
-                self.log_signal.emit("P2P Error. Retrying...")
-
-            elif event_type in ["livestream stopped"]:
-                self.stop_recording_process()
-
-    def request_stream(self):
-        if self.ws and self.serial_number:
-            self.ws.send(json.dumps({
-                "messageId": "trigger_live",
-                "command": "device.start_livestream",
-                "serialNumber": self.serial_number
-            }))
-            if self.retry_timer:
-                self.retry_timer.cancel()
-            self.retry_timer = threading.Timer(6.0, self.check_retry)
-            self.retry_timer.start()
-
-    def check_retry(self):
-        if self.running and not self.recording_active and self.serial_number:
-            if self.retries < 3:
-                self.retries += 1
-                self.log_signal.emit(f"REC: Retry Wake Up ({self.retries}/3)...")
-                self.request_stream()
-            else:
-                self.log_signal.emit("Camera Unreachable.")
-                self.motion_signal.emit(False)
-                self.retries = 0
-
-    def start_recording_process(self):
-        if self.retry_timer:
-            self.retry_timer.cancel() 
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        filepath = os.path.join(RECORD_DIR, f"eufy_{timestamp}.mp4")
-        cmd = ["ffmpeg", "-y", "-i", "pipe:0", "-c", "copy", "-f", "mp4", "-movflags", "frag_keyframe+empty_moov", filepath]
-        try:
-            self.ffmpeg_process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
-            self.recording_active = True
-            self.log_signal.emit("REC: Stream Active")
-            if self.stop_timer:
-                self.stop_timer.cancel()
-            self.stop_timer = threading.Timer(30.0, self.stop_recording_process)
-            self.stop_timer.start()
-        except Exception as e:
-            print(f"FFmpeg Spawn Error: {e}")
-
-    def stop_recording_process(self):
-        self.retries = 0
-        if self.retry_timer: self.retry_timer.cancel()
-        if self.stop_timer: self.stop_timer.cancel()
-        if self.recording_active:
-            self.recording_active = False
-            if self.ffmpeg_process:
-                try:
-                    self.ffmpeg_process.stdin.close()
-                    self.ffmpeg_process.wait(timeout=2)
-                except:
-                    self.ffmpeg_process.kill()
-                self.ffmpeg_process = None
-            self.motion_signal.emit(False)
-            self.log_signal.emit("Standby.")
-            if self.ws and self.serial_number:
-                try:
-                    self.ws.send(json.dumps({
-                        "messageId": "stop_live",
-                        "command": "device.stop_livestream",
-                        "serialNumber": self.serial_number
-                    }))
-                except: pass
-
-    def on_error(self, ws, error): self.log_signal.emit(f"Error: {error}")
-    def on_close(self, ws, a, b): self.stop_recording_process()
-
-    def stop(self):
-        self.running = False
-        self.stop_recording_process()
-        if self.ws: self.ws.close()
+class RecordingsDialog(QDialog):
+    RANGES = [("Last hour", 3600), ("Last 24 hours", 86400), ("Last 7 days", 7 * 86400), ("All", None)]
+
+    def __init__(self, catalog, names, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.names = names  # serial -> camera name
+        self.setWindowTitle("Recordings")
+        self.resize(420, 360)
+        layout = QVBoxLayout(self)
+        filters = QHBoxLayout()
+        self.camera = QComboBox()
+        self.camera.addItem("All cameras", None)
+        for serial in catalog.serials():
+            self.camera.addItem(self.camera_name(serial), serial)
+        self.range = QComboBox()
+        for label, seconds in self.RANGES:
+            self.range.addItem(label, seconds)
+        filters.addWidget(self.camera); filters.addWidget(self.range)
+        layout.addLayout(filters)
+        self.clips = QListWidget()
+        self.clips.setIconSize(QSize(96, 54))
+        self.clips.itemActivated.connect(self.open_clip)
+        layout.addWidget(self.clips)
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+        self.camera.currentIndexChanged.connect(self.refresh)
+        self.range.currentIndexChanged.connect(self.refresh)
+        self.refresh()
+
+    def camera_name(self, serial):
+        return self.names.get(serial) or (f"Camera {serial[-4:]}" if serial else "Camera")
+
+    def refresh(self):
+        seconds = self.range.currentData()
+        clips = self.catalog.query(self.camera.currentData(), since=time.time() - seconds if seconds else None, limit=1000)
+        self.clips.clear()
+        for clip in clips:
+            minutes, secs = divmod(int(clip["duration"]), 60)
+            item = QListWidgetItem(f"{time.strftime('%a %H:%M:%S', time.localtime(clip['started']))}   "
+                                   f"{self.camera_name(clip['serial'])}   {minutes}:{secs:02d}   {clip['bytes'] / 1e6:.1f} MB")
+            item.setData(Qt.ItemDataRole.UserRole, clip["path"])
+            if clip["snapshot"]:
+                item.setIcon(QIcon(clip["snapshot"]))
+            self.clips.addItem(item)
+        totals = self.catalog.totals()
+        self.summary.setText(f"{len(clips)} shown · {totals['clips']} clips, {totals['bytes'] / 1e9:.2f} GB on disk")
+
+    def open_clip(self, item):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(item.data(Qt.ItemDataRole.UserRole)))
 
 class OnnMasterRemote(QWidget):
+    # Keyboard passthrough when no text box has focus
+    PASSTHROUGH_KEYS = {Qt.Key.Key_Up: 19, Qt.Key.Key_Down: 20, Qt.Key.Key_Left: 21, Qt.Key.Key_Right: 22,
+                        Qt.Key.Key_Return: 66, Qt.Key.Key_Enter: 66, Qt.Key.Key_Escape: 4, Qt.Key.Key_Home: 3,
+                        Qt.Key.Key_Minus: 25, Qt.Key.Key_Plus: 24}
+    MACRO_GAP = (0.5, 2.0)  # recorded pauses: shorter ones are dropped, longer ones capped
+
+    adb_status_signal = pyqtSignal(str, bool)
+    device_state_signal = pyqtSignal(dict)
+    rec_signal = pyqtSignal(str, bool)
+    cam_log_signal = pyqtSignal(str)
+    spell_signal = pyqtSignal(object, str, str)
+    snapshot_signal = pyqtSignal(str, str, str)
+
     def __init__(self):
         super().__init__()
         self.is_quitting = False  # Track if we are actually closing
+        self.startup_profile = "--startup-profile" in sys.argv
         self.load_settings()
-        self.client = AdbClient(host="127.0.0.1", port=5037)
-        self.device = None
-        
-        self.monitor_thread = EufyWebsocketWorker()
-        self.monitor_thread.motion_signal.connect(self.update_rec_status)
-        self.monitor_thread.log_signal.connect(self.update_cam_status)
-        self.monitor_thread.start()
+        mark_startup("settings")
+
+        # TVs, recorder, alerts and the control socket; their threads report back through queued signals
+        self.core = RemoteCore(self.config, on_status=self.adb_status_signal.emit, on_state=self.device_state_signal.emit,
+                               on_recording=self.rec_signal.emit, on_log=self.cam_log_signal.emit,
+                               on_snapshot=self.snapshot_signal.emit)
+        self.tvs = self.core.tvs
+        self.adb_status_signal.connect(self.render_status)
+        self.device_state_signal.connect(self.render_status)
+        self.rec_signal.connect(self.update_rec_status)
+        self.cam_log_signal.connect(self.update_cam_status)
+        self.snapshot_signal.connect(self.show_snapshot)
+
+        # Spellcheck and completions; the dictionary loads on this thread once started
+        self.spell = SpellService(self.config.get("spell_titles", []), on_ready=self.spell_ready)
+        self.spell_signal.connect(self.apply_spelling)
+        self.macro_steps = None  # steps while recording a macro
+        self.macro_last = 0.0
+        self.shortcuts = []
         
         self.init_ui()
         self.setup_tray() # Build the system tray icon
-        self.connect_to_device()
+        mark_startup("ui")
         
         if self.always_on_top:
             self.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, True)
 
+        # Window first: threads, connections and the spellchecker start once the event loop runs
+        QTimer.singleShot(0, self.start_services)
+
+    def start_services(self):
+        mark_startup("window")
+        self.core.start()
+        self.spell.start()
+        mark_startup("services")
+        if self.startup_profile:
+            print(startup_report(), flush=True)
+
+    def spell_ready(self):
+        mark_startup("spellchecker")
+        if self.startup_profile:
+            print(f"Spellchecker ready in the background ({STARTUP_PHASES[-1][1] * 1000:.0f} ms after start)", flush=True)
+
     def setup_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
         
@@ -261,27 +209,17 @@ class OnnMasterRemote(QWidget):
 
     def quit_app(self):
         self.is_quitting = True
-        if self.monitor_thread:
-            self.monitor_thread.stop()
-            self.monitor_thread.wait()
+        self.core.stop()
+        self.spell.stop()
         QApplication.quit()
 
     def load_settings(self):
-        self.ip = "192.168.50.94"
-        self.always_on_top = False
-        if os.path.exists(CONFIG_FILE):
-            try:
-                with open(CONFIG_FILE, 'r') as f:
-                    data = json.load(f)
-                    self.ip = data.get("ip", self.ip)
-                    self.always_on_top = data.get("always_on_top", False)
-            except: pass
+        self.config = load_config()
+        self.always_on_top = self.config.get("always_on_top", False)
 
     def save_settings(self):
-        try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump({"ip": self.ip, "always_on_top": self.always_on_top}, f)
-        except Exception as e: print(f"Save error: {e}")
+        self.config["always_on_top"] = self.always_on_top
+        self.core.save()
 
     def init_ui(self):
         self.setWindowTitle("ONN Master Control v1.05")
@@ -310,6 +248,11 @@ class OnnMasterRemote(QWidget):
         sec_row.addWidget(self.rec_light)
         sec_row.addWidget(self.cam_status)
         sec_layout.addLayout(sec_row)
+        # Latest motion snapshot; hidden until a camera has produced one
+        self.snapshot = QLabel()
+        self.snapshot.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.snapshot.hide()
+        sec_layout.addWidget(self.snapshot)
         layout.addLayout(sec_layout)
 
         p_row = QHBoxLayout()
@@ -319,19 +262,37 @@ class OnnMasterRemote(QWidget):
         layout.addLayout(p_row)
 
         status_row = QHBoxLayout()
-        self.status_label = QLabel(f"IP: {self.ip}")
+        self.status_label = QLabel(f"IP: {self.core.tv().ip}")
         gear = QPushButton("⚙"); gear.setFixedWidth(45); gear.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         menu = QMenu(self)
+        self.target_menu = menu.addMenu("Control"); self.target_menu.aboutToShow.connect(self.build_target_menu)
         ip_act = menu.addAction("Update TV IP"); ip_act.triggered.connect(self.change_ip)
+        add_act = menu.addAction("Add TV..."); add_act.triggered.connect(self.add_tv)
         top_act = menu.addAction("Always On Top"); top_act.setCheckable(True); top_act.setChecked(self.always_on_top); top_act.triggered.connect(self.toggle_always_on_top)
+        stats_act = menu.addAction("Show Stats"); stats_act.setCheckable(True); stats_act.triggered.connect(self.toggle_stats)
+        titles_act = menu.addAction("Spellcheck Titles..."); titles_act.triggered.connect(self.edit_titles)
+        rec_act = menu.addAction("Recordings..."); rec_act.triggered.connect(self.show_recordings)
+        macro_act = menu.addAction("Record Macro"); macro_act.setCheckable(True); macro_act.triggered.connect(self.toggle_macro_recording)
         gear.setMenu(menu)
-        status_row.addWidget(self.status_label); status_row.addWidget(gear)
+        self.macro_light = QLabel("● MACRO")
+        self.macro_light.setStyleSheet("color: #ff1744; font-weight: bold;")
+        self.macro_light.hide()
+        status_row.addWidget(self.status_label); status_row.addWidget(self.macro_light); status_row.addWidget(gear)
         layout.addLayout(status_row)
 
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet("font-family: monospace; font-size: 11px; color: #9e9e9e;")
+        self.stats_label.hide()
+        layout.addWidget(self.stats_label)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.stats_prev = {}
+
         layout.addWidget(QLabel("<b>TYPE TO APP (Netflix):</b>"))
         type_row = QHBoxLayout()
         self.text_input = HistoryLineEdit()
         self.text_input.returnPressed.connect(self.handle_typing)
+        self.attach_completer(self.text_input)
         btn_spell_app = QPushButton("A✓"); btn_spell_app.setFixedWidth(40); btn_spell_app.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn_spell_app.clicked.connect(lambda: self.run_spellcheck(self.text_input))
         btn_bksp = QPushButton("⌫"); btn_bksp.setFixedWidth(40); btn_bksp.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn_bksp.clicked.connect(lambda: self.send_key(67))
         btn_clear = QPushButton("Clear"); btn_clear.setFixedWidth(60); btn_clear.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn_clear.clicked.connect(self.clear_tv_text)
@@ -342,6 +303,7 @@ class OnnMasterRemote(QWidget):
         search_row = QHBoxLayout()
         self.search_input = HistoryLineEdit()
         self.search_input.returnPressed.connect(self.handle_global_search)
+        self.attach_completer(self.search_input)
         btn_spell_global = QPushButton("A✓"); btn_spell_global.setFixedWidth(40); btn_spell_global.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn_spell_global.clicked.connect(lambda: self.run_spellcheck(self.search_input))
         btn_search = QPushButton("Search"); btn_search.setFixedWidth(70); btn_search.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn_search.clicked.connect(self.handle_global_search)
         search_row.addWidget(self.search_input); search_row.addWidget(btn_spell_global); search_row.addWidget(btn_search)
@@ -362,10 +324,13 @@ class OnnMasterRemote(QWidget):
         layout.addLayout(vol_row)
 
         app_grid = QGridLayout()
-        for i, (name, cmd) in enumerate(APP_MAP.items()):
-            btn = QPushButton(name); btn.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn.clicked.connect(lambda ch, c=cmd: self.launch_app(c))
+        for i, name in enumerate(APP_MAP):
+            btn = QPushButton(name); btn.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn.clicked.connect(lambda ch, n=name: self.launch_app(n))
             app_grid.addWidget(btn, i // 2, i % 2)
         layout.addLayout(app_grid)
+        self.macro_grid = QGridLayout()
+        layout.addLayout(self.macro_grid)
+        self.build_macros()
         self.setLayout(layout)
 
     def create_btn(self, text, code):
@@ -376,6 +341,32 @@ class OnnMasterRemote(QWidget):
     def mousePressEvent(self, event):
         self.setFocus(); super().mousePressEvent(event)
 
+    def toggle_stats(self, checked):
+        self.stats_label.setVisible(checked)
+        if checked:
+            self.refresh_stats()
+            self.stats_timer.start(1000)
+        else:
+            self.stats_timer.stop()
+        self.adjustSize()
+
+    def refresh_stats(self):
+        # The figures come from core.stats(); only the rates need the previous sample
+        now = time.monotonic()
+        stats = self.core.stats(recordings=False)
+        lines = []
+        for serial, cam in stats["cameras"].items():
+            t, f, b = self.stats_prev.get(serial, (now, cam["frames"], cam["bytes"]))
+            self.stats_prev[serial] = (now, cam["frames"], cam["bytes"])
+            dt = (now - t) or 1
+            lines.append(f"{serial[-4:]}  {(cam['frames'] - f) / dt:4.1f} fps {(cam['bytes'] - b) * 8 / dt / 1000:6.0f} kbps"
+                         f"  q {cam['queued_bytes'] / 1024:5.0f}K"
+                         f"  wr p95 {cam['write_p95_ms'] or 0:4.0f}ms"
+                         f"  wake {cam['wake_s'] or 0:4.1f}s")
+        adb = [f"{kind} {ms:.0f}" for kind, ms in stats["adb_p50_ms"].items()]
+        lines.append("adb p50 ms: " + (" ".join(adb) or "-"))
+        self.stats_label.setText("\n".join(lines))
+
     def toggle_always_on_top(self, checked):
         self.always_on_top = checked
         self.save_settings()
@@ -386,120 +377,209 @@ class OnnMasterRemote(QWidget):
         if self.text_input.hasFocus() or self.search_input.hasFocus():
             super().keyPressEvent(event)
             return
-        key = event.key()
-        if key == Qt.Key.Key_Up: self.send_key(19)
-        elif key == Qt.Key.Key_Down: self.send_key(20)
-        elif key == Qt.Key.Key_Left: self.send_key(21)
-        elif key == Qt.Key.Key_Right: self.send_key(22)
-        elif key in (Qt.Key.Key_Return, Qt.Key.Key_Enter): self.send_key(66)
-        elif key == Qt.Key.Key_Escape: self.send_key(4)
-        elif key == Qt.Key.Key_Home: self.send_key(3)
-        elif key == Qt.Key.Key_Minus: self.send_key(25)
-        elif key == Qt.Key.Key_Plus: self.send_key(24)
-        else: super().keyPressEvent(event)
-
-    def update_rec_status(self, is_recording):
-        color = "#ff1744" if is_recording else "#444"
-        self.rec_light.setStyleSheet(f"color: {color}; font-weight: bold;")
-        
-        if is_recording:
-            cmd = (
-                'am broadcast -a de.cyberdream.androidtv.notifications.google.SEND '
-                '--es title "SECURITY ALERT" '
-                '--es msg "Motion detected at the front door!" '
-                '--ei type 2 '
-                '--ei duration 8 '
-                '--ei position 2'
-            )
+        code = self.PASSTHROUGH_KEYS.get(event.key())
+        if code is None:
+            super().keyPressEvent(event)
+            return
+        self.record_step(key_name(code))
+        self.send_key(code)
+
+    # --- macros ---
+
+    def build_macros(self):
+        # Buttons and hotkeys for the config's macros; rebuilt after recording one
+        while self.macro_grid.count():
+            self.macro_grid.takeAt(0).widget().deleteLater()
+        for shortcut in self.shortcuts:
+            shortcut.setEnabled(False); shortcut.deleteLater()
+        self.shortcuts = []
+        buttons = 0
+        for name, macro in sorted(self.core.macros().items()):
+            options = macro if isinstance(macro, dict) else {}
+            if options.get("button", True):
+                btn = QPushButton(name); btn.setFocusPolicy(Qt.FocusPolicy.NoFocus); btn.clicked.connect(lambda ch, n=name: self.run_macro(n))
+                self.macro_grid.addWidget(btn, buttons // 2, buttons % 2)
+                buttons += 1
+            if options.get("hotkey"):
+                shortcut = QShortcut(QKeySequence(options["hotkey"]), self)
+                shortcut.activated.connect(lambda n=name: self.run_macro(n))
+                self.shortcuts.append(shortcut)
+
+    def run_macro(self, name):
+        try:
+            self.core.macro(name)
+        except ValueError as e:
+            print(f"Macro error ({name}): {e}")
+
+    def record_step(self, step):
+        if self.macro_steps is None:
+            return
+        now = time.monotonic()
+        gap = now - self.macro_last
+        if self.macro_steps and gap >= self.MACRO_GAP[0]:
+            self.macro_steps.append({"sleep": round(min(gap, self.MACRO_GAP[1]), 1)})
+        self.macro_steps.append(step)
+        self.macro_last = now
+
+    def toggle_macro_recording(self, checked):
+        self.macro_light.setVisible(checked)
+        if checked:
+            self.macro_steps = []
+            self.setFocus()
+            return
+        steps, self.macro_steps = self.macro_steps, None
+        if not steps:
+            return
+        name, ok = QInputDialog.getText(self, 'Record Macro', f'Name for these {len(steps)} steps:')
+        if ok and name.strip():
             try:
-                if not self.device: self.connect_to_device()
-                if self.device: self.device.shell(cmd)
-            except Exception as e:
-                print(f"Failed to send TV notification: {e}")
+                self.core.save_macro(name.strip(), steps)
+            except ValueError as e:
+                print(f"Macro error: {e}")
+            self.build_macros()
+        self.setFocus()
+
+    def update_rec_status(self, serial, is_recording):
+        # The light stays on while any camera is active
+        color = "#ff1744" if self.core.active_cameras else "#444"
+        self.rec_light.setStyleSheet(f"color: {color}; font-weight: bold;")
 
     def update_cam_status(self, msg): 
         self.cam_status.setText(msg)
+
+    def show_snapshot(self, serial, path, thumb_path):
+        pixmap = QPixmap(thumb_path or path)
+        if pixmap.isNull():
+            return
+        self.snapshot.setPixmap(pixmap.scaledToWidth(240, Qt.TransformationMode.SmoothTransformation))
+        name = self.config.get("camera_names", {}).get(serial) or f"Camera {serial[-4:]}"
+        self.snapshot.setToolTip(f"{name} · {time.strftime('%H:%M:%S')}")
+        self.snapshot.show()
     
+    def attach_completer(self, line_edit):
+        model = QStringListModel(self)
+        completer = QCompleter(model, self)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        line_edit.setCompleter(completer)
+
+        def on_edit(text):
+            suggestions = self.spell.completions(text)
+            model.setStringList(suggestions)
+            if suggestions: completer.complete()
+            else: completer.popup().hide()
+            self.spell.prefetch(text)
+        line_edit.textEdited.connect(on_edit)
+
     def run_spellcheck(self, input_widget):
-        if not spell: return
         text = input_widget.text()
         if not text: return
-        words = text.split()
-        corrected = [spell.correction(w) or w for w in words]
-        input_widget.setText(" ".join(corrected))
+        self.spell.request(text, lambda corrected: self.spell_signal.emit(input_widget, text, corrected))
+
+    def apply_spelling(self, input_widget, original, corrected):
+        # Drop the result if the user kept typing meanwhile
+        if input_widget.text() == original and corrected != original:
+            input_widget.setText(corrected)
+
+    def edit_titles(self):
+        text, ok = QInputDialog.getMultiLineText(self, 'Settings', 'Show and movie titles (one per line):',
+                                                 "\n".join(self.config.get("spell_titles", [])))
+        if ok:
+            titles = [line.strip() for line in text.splitlines() if line.strip()]
+            self.config["spell_titles"] = titles
+            self.spell.set_titles(titles)
+            self.save_settings()
+        self.setFocus()
+
+    def show_recordings(self):
+        RecordingsDialog(self.core.catalog, self.config.get("camera_names", {}), self).exec()
+        self.setFocus()
 
     def handle_typing(self):
         text = self.text_input.text()
         if text:
             self.text_input.add_to_history(text)
-            formatted_text = text.replace(' ', '%s')
-            cmd = f"input text {formatted_text} && sleep 0.5 && input keyevent 4"
-            try:
-                if not self.device: self.connect_to_device()
-                self.device.shell(cmd)
-            except:
-                self.connect_to_device()
-                if self.device: self.device.shell(cmd)
+            self.spell.add_phrase(text)
+            self.record_step({"text": text})
+            self.core.type_text(text)
             self.text_input.clear(); self.text_input.clearFocus(); self.setFocus()
 
     def clear_tv_text(self):
-        threading.Thread(target=self._clear_thread).start()
+        self.core.clear_text()
         self.setFocus()
 
-    def _clear_thread(self):
-        try:
-            if not self.device: self.connect_to_device()
-            self.device.shell("for i in `seq 1 30`; do input keyevent 67; done")
-        except: pass
-
     def handle_global_search(self):
         text = self.search_input.text()
         if text:
             self.search_input.add_to_history(text)
-            try:
-                if not self.device: self.connect_to_device()
-                self.device.shell(f'am start -a android.search.action.GLOBAL_SEARCH --es query "{text}"')
-            except:
-                self.connect_to_device()
-                if self.device: self.device.shell(f'am start -a android.search.action.GLOBAL_SEARCH --es query "{text}"')
+            self.spell.add_phrase(text)
+            self.core.search(text)
             self.search_input.clear(); self.search_input.clearFocus(); self.setFocus()
 
     def wake_tv(self):
-        try:
-            if not self.device: self.connect_to_device()
-            self.device.shell("input keyevent 0 && sleep 0.3 && input keyevent 224")
-        except:
-            self.connect_to_device()
-            if self.device: self.device.shell("input keyevent 0 && sleep 0.3 && input keyevent 224")
+        self.record_step("wake")
+        self.core.wake()
 
     def send_key(self, code):
-        try:
-            if not self.device: self.connect_to_device()
-            self.device.shell(f"input keyevent {code}")
-        except:
-            self.connect_to_device()
-            if self.device: self.device.shell(f"input keyevent {code}")
-
-    def launch_app(self, cmd):
-        try:
-            if not self.device: self.connect_to_device()
-            self.device.shell(cmd)
-        except:
-            self.connect_to_device()
-            if self.device: self.device.shell(cmd)
+        self.core.key(code)
+
+    def launch_app(self, name):
+        self.record_step({"launch": name})
+        self.core.launch(name)
+
+    def build_target_menu(self):
+        self.target_menu.clear()
+        group = QActionGroup(self.target_menu)
+        names = list(self.tvs.devices)
+        if len(names) > 1:
+            names += self.tvs.groups() + [ALL]
+        for name in names:
+            act = self.target_menu.addAction(name); act.setCheckable(True); act.setChecked(name == self.core.target)
+            act.triggered.connect(lambda ch, n=name: self.select_target(n))
+            group.addAction(act)
+
+    def select_target(self, name):
+        self.core.target = name
+        self.save_settings()
+        self.render_status()
 
     def change_ip(self):
-        new_ip, ok = QInputDialog.getText(self, 'Settings', 'Update TV IP:', text=self.ip)
+        tv = self.core.tv()
+        new_ip, ok = QInputDialog.getText(self, 'Settings', f'Update IP for {tv.name}:', text=tv.ip)
         if ok and new_ip:
-            self.ip = new_ip; self.save_settings(); self.connect_to_device()
+            tv.set_ip(new_ip); self.save_settings()
         self.setFocus()
 
-    def connect_to_device(self):
-        subprocess.run(["adb", "connect", f"{self.ip}:5555"], capture_output=True)
-        try:
-            self.device = self.client.device(f"{self.ip}:5555")
-            self.status_label.setText(f"ONLINE: {self.ip}" if self.device else "OFFLINE")
-        except: self.device = None; self.status_label.setText("OFFLINE")
+    def add_tv(self):
+        ip, ok = QInputDialog.getText(self, 'Settings', 'IP of the new TV:')
+        if ok and ip:
+            name, ok = QInputDialog.getText(self, 'Settings', 'Name:', text=f"TV {len(self.tvs.devices) + 1}")
+            if ok and name and name not in self.tvs.devices:
+                self.core.add_tv(name, ip)
+        self.setFocus()
+
+    def render_status(self, *args):
+        tvs = self.tvs.select(self.core.target)
+        if len(tvs) > 1:
+            online = sum(1 for tv in tvs if tv.state.get("online"))
+            self.status_label.setText(f"{self.core.target.upper()}: {online}/{len(tvs)} ONLINE")
+            return
+        tv = tvs[0]
+        state = tv.state.snapshot()
+        if not state.get("online"):
+            self.status_label.setText("OFFLINE")
+            return
+        parts = [f"ONLINE: {tv.name if len(self.tvs.devices) > 1 else tv.ip}"]
+        if state.get("screen"):
+            parts.append(SCREEN_LABELS.get(state["screen"], state["screen"]))
+        pkg = state.get("foreground")
+        if pkg:
+            parts.append(app_name(pkg))
+        if state.get("muted"):
+            parts.append("Muted")
+        elif state.get("volume") is not None:
+            parts.append(f"Vol {state['volume']}" + (f"/{state['volume_max']}" if state.get("volume_max") else ""))
+        self.status_label.setText(" | ".join(parts))
 
     def closeEvent(self, event):
         if not self.is_quitting:
@@ -517,11 +597,15 @@ class OnnMasterRemote(QWidget):
             super().closeEvent(event)
 
 if __name__ == "__main__":
+    mark_startup("imports")
     app = QApplication(sys.argv)
+    mark_startup("qt")
     
     # Crucial: Prevent PyQt6 from killing the app when the last window is hidden!
     app.setQuitOnLastWindowClosed(False) 
     
     window = OnnMasterRemote()
-    window.show()
+    # --tray: autostart straight into the system tray
+    if "--tray" not in sys.argv:
+        window.show()
     sys.exit(app.exec())
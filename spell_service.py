@@ -0,0 +1,236 @@
+import collections
+import functools
+import threading
+import time
+
+import metrics
+
+# Spelling help for the TV text boxes. Phrases the user already searched for
+# and their title list ("spell_titles" in the config) are indexed in a trie:
+# the GUI reads it directly for as-you-type completions, and corrections
+# prefer those words and titles over the dictionary. The dictionary pass
+# (pyspellchecker, up to a second per long unknown word) runs on a worker
+# thread behind an LRU cache.
+
+SPELL_SECONDS = metrics.Histogram("spellcheck_seconds", "Time to correct one text box, on the spellcheck thread")
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance, or limit + 1 as soon as it must exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class PrefixIndex:
+    """Trie from lowercase keys to values (the original spelling). Thread-safe."""
+
+    def __init__(self):
+        self.root = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, value):
+        with self.lock:
+            node = self.root
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[None] = value
+
+    def get(self, key):
+        with self.lock:
+            node = self._find(key)
+            return node.get(None) if node else None
+
+    def search(self, prefix, limit=None):
+        # Values under prefix, shortest keys first
+        with self.lock:
+            node = self._find(prefix)
+            if node is None:
+                return []
+            found = []
+            level = [node]
+            while level and (limit is None or len(found) < limit):
+                next_level = []
+                for n in level:
+                    for ch, child in n.items():
+                        if ch is None:
+                            found.append(child)
+                        else:
+                            next_level.append(child)
+                level = next_level
+            return found[:limit] if limit else found
+
+    def _find(self, key):
+        node = self.root
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node
+
+
+class SpellService(threading.Thread):
+    def __init__(self, titles=(), on_ready=None, cache_size=4096):
+        super().__init__(daemon=True)
+        self.on_ready = on_ready
+        self.checker = None
+        self.titles = PrefixIndex()   # lowercase title (and each word-suffix of it) -> title
+        self.title_keys = {}          # lowercase title -> title, for whole-text matches
+        self.phrases = PrefixIndex()  # same for search history
+        self.words = PrefixIndex()    # lowercase word -> word, from titles and history
+        self.title_words = {}         # lowercase word -> word, per source, to rebuild self.words
+        self.phrase_words = {}
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self.running = True
+        self._lookup = functools.lru_cache(maxsize=cache_size)(self._correct_word)
+        for title in titles:
+            self.add_phrase(title, title=True)
+
+    # --- any thread ---
+
+    def add_phrase(self, text, title=False):
+        added = {}
+        if title:
+            self._index(text, self.titles, added, self.title_keys)
+            self.title_words.update(added)
+        else:
+            self._index(text, self.phrases, added)
+            self.phrase_words.update(added)
+        new = [word for key, word in added.items() if self.words.get(key) is None]
+        for word in new:
+            self.words.add(word.lower(), word)
+        if new:
+            # Cached corrections only change when there is a word to prefer
+            self._submit(("clear", None, None))
+
+    def set_titles(self, titles):
+        index, keys, words = PrefixIndex(), {}, {}
+        for title in titles:
+            self._index(title, index, words, keys)
+        self.titles, self.title_keys = index, keys
+        if words == self.title_words:
+            return
+        self.title_words = words
+        # Rebuilt rather than patched, so words only the old titles had are gone
+        combined = PrefixIndex()
+        for source in (words, self.phrase_words):
+            for key, word in source.items():
+                if combined.get(key) is None:
+                    combined.add(key, word)
+        self.words = combined
+        self._submit(("clear", None, None))
+
+    @staticmethod
+    def _index(text, index, words, keys=None):
+        text = " ".join(text.split())
+        if not text:
+            return
+        parts = text.split(" ")
+        if keys is not None:
+            keys[text.lower()] = text
+        for i in range(len(parts)):
+            # Index every word start, so "things" completes to "Stranger Things"
+            index.add(" ".join(parts[i:]).lower(), text)
+        for word in parts:
+            if word.isalpha():
+                words[word.lower()] = word
+
+    def completions(self, text, limit=8):
+        prefix = " ".join(text.lower().split())
+        if not prefix:
+            return []
+        found = []
+        for value in self.titles.search(prefix) + self.phrases.search(prefix):
+            if value not in found:
+                found.append(value)
+            if len(found) == limit:
+                break
+        return found
+
+    def request(self, text, callback):
+        # callback(corrected) runs on the spellcheck thread
+        self._submit(("correct", text, callback))
+
+    def prefetch(self, text):
+        # Warm the cache while the user is still typing; only the newest text matters
+        with self.cond:
+            if self.queue and self.queue[-1][0] == "prefetch":
+                self.queue.pop()
+        self._submit(("prefetch", text, None))
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.queue.clear()
+            self.cond.notify()
+
+    def _submit(self, item):
+        with self.cond:
+            self.queue.append(item)
+            self.cond.notify()
+
+    # --- spellcheck thread ---
+
+    def run(self):
+        try:
+            from spellchecker import SpellChecker
+            self.checker = SpellChecker()
+        except ImportError:
+            pass
+        if self.on_ready:
+            self.on_ready()
+        while True:
+            with self.cond:
+                while self.running and not self.queue:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                kind, text, callback = self.queue.popleft()
+            if kind == "clear":
+                self._lookup.cache_clear()
+                continue
+            t0 = time.perf_counter()
+            corrected = self.correct(text)
+            if kind == "correct":
+                SPELL_SECONDS.observe(time.perf_counter() - t0)
+                callback(corrected)
+
+    def correct(self, text):
+        key = " ".join(text.lower().split())
+        title = self.title_keys.get(key)
+        if title:
+            return title
+        words = []
+        for word in text.split():
+            fixed = self._lookup(word.lower())
+            words.append(word if fixed is None or fixed.lower() == word.lower() else fixed)
+        corrected = " ".join(words)
+        return self.title_keys.get(corrected.lower()) or corrected
+
+    def _correct_word(self, word):
+        # None = leave the word alone
+        if not word.isalpha():
+            return None
+        known = self.words.get(word)
+        if known:
+            return known
+        if self.checker is not None and self.checker.known([word]):
+            return None
+        limit = 1 if len(word) < 5 else 2
+        best, best_distance = None, limit + 1
+        for candidate in self.words.search(word[:1]):
+            distance = edit_distance(word, candidate.lower(), limit)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        if best:
+            return best
+        return self.checker.correction(word) if self.checker is not None else None
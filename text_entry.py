@@ -0,0 +1,62 @@
+import math
+import unicodedata
+
+# Shell commands for typing into and clearing TV text fields. Each helper
+# returns one script, so a whole action is a single ADB round-trip, and every
+# `input` invocation (a JVM start on the box) is made to count.
+
+INPUT_CHUNK = 200  # characters per `input text`; longer strings get dropped keys on some IMEs
+CLEAR_KEYS = 30
+
+KEYCODE_BACK = 4
+KEYCODE_DEL = 67
+KEYCODE_MOVE_END = 123
+
+# `input text` can only type what the virtual keyboard map has: fold the rest to ASCII
+_ASCII = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"',
+                        "–": "-", "—": "-", "…": "...", "\u00a0": " "})
+
+
+def quote(text):
+    # Single-quote for the device's sh
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+def ascii_fold(text):
+    text = unicodedata.normalize("NFKD", text.translate(_ASCII))
+    return "".join(ch for ch in text if " " <= ch <= "~")
+
+
+def wait_until(check, timeout=1.0, step=0.1):
+    # Poll a shell condition on the box instead of sleeping a fixed time. The
+    # deadline is read from /proc/uptime (centiseconds), so a slow check such
+    # as dumpsys can't stretch the wait past timeout.
+    now = "read _t _ </proc/uptime; _t=${_t%.*}${_t#*.}"
+    return (f"{now}; _end=$((_t + {max(1, math.ceil(timeout * 100))})); "
+            f"until {check}; do {now}; [ $_t -ge $_end ] && break; sleep {step}; done")
+
+
+def type_command(text, dismiss=True):
+    """`input text` for text (spaces as %s), chunked, then BACK to drop the keyboard."""
+    text = ascii_fold(text)
+    # `input text` turns every %s into a space, so a literal "%s" ("50%s off") is
+    # split across two calls: one ending in "%", the next starting with "s"
+    pieces = text.split("%s")
+    segments = [("s" if n else "") + piece + ("%" if n < len(pieces) - 1 else "")
+                for n, piece in enumerate(pieces)]
+    parts = [f"input text {quote(segment[i:i + INPUT_CHUNK].replace(' ', '%s'))}"
+             for segment in segments for i in range(0, len(segment), INPUT_CHUNK)]
+    if dismiss and parts:
+        # Give the IME time to commit the text; BACK any sooner can drop the tail
+        parts.append("sleep 0.5")
+        parts.append(f"input keyevent {KEYCODE_BACK}")
+    return "; ".join(parts)
+
+
+def clear_command(count=CLEAR_KEYS):
+    # Cursor to the end, then every DEL in the same `input keyevent` call
+    return f"input keyevent {KEYCODE_MOVE_END}" + f" {KEYCODE_DEL}" * count
+
+
+WAKE_COMMAND = ("input keyevent 0 224; "
+                + wait_until("dumpsys power | grep -q mWakefulness=Awake", 2.0))
@@ -0,0 +1,101 @@
+from adb_executor import AdbCommandExecutor
+from device_state import DeviceState, DevicePoller
+
+# The TVs we control, from the "tvs" list in the config:
+#   "tvs": [{"name": "Living Room", "ip": "192.168.50.94"},
+#           {"name": "Office", "ip": "192.168.50.95", "port": 5555, "groups": ["alerts"]}]
+# Without one, the legacy single "ip" is used. Every TV gets its own executor
+# thread (with its own device handle and persistent shell session), state
+# cache and poller, so a dozing box only ever delays its own commands.
+
+ALL = "All TVs"
+
+
+def tv_entries(config, default_ip):
+    if config.get("tvs"):
+        return config["tvs"]
+    return [{"name": "TV", "ip": config.get("ip", default_ip)}]
+
+
+class TvDevice:
+    def __init__(self, entry, mode="session", on_status=None, on_result=None, on_state=None):
+        self.entry = entry  # the dict from the config; ip changes are written back into it
+        self.name = entry.get("name") or entry["ip"]
+        self.groups = set(entry.get("groups", ()))
+        self.adb = AdbCommandExecutor(
+            entry["ip"], entry.get("port", 5555), mode=mode,
+            on_status=(lambda online, ip: on_status(self.name, online)) if on_status else None,
+            on_result=(lambda tag, output: on_result(self.name, tag, output)) if on_result else None)
+        self.state = DeviceState()
+        self.poller = DevicePoller(self.adb, self.state, on_change=on_state)
+
+    @property
+    def ip(self):
+        return self.entry["ip"]
+
+    def set_ip(self, ip):
+        self.entry["ip"] = ip
+        self.adb.connect(ip)
+
+    def start(self):
+        self.adb.start()
+        self.adb.connect()
+        self.poller.start()
+
+    def stop(self):
+        self.poller.stop()
+        self.adb.stop()
+
+
+class TvRegistry:
+    def __init__(self, entries, **device_options):
+        self.device_options = device_options
+        self.devices = {}
+        self.started = False
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        tv = TvDevice(entry, **self.device_options)
+        self.devices[tv.name] = tv
+        if self.started:
+            tv.start()
+        return tv
+
+    def groups(self):
+        names = set()
+        for tv in self.devices.values():
+            names |= tv.groups
+        return sorted(names - set(self.devices))
+
+    def select(self, target):
+        # A TV name, a group name, or ALL; unknown names fall back to the first TV
+        if target == ALL:
+            return list(self.devices.values())
+        if target in self.devices:
+            return [self.devices[target]]
+        members = [tv for tv in self.devices.values() if target in tv.groups]
+        return members or list(self.devices.values())[:1]
+
+    def broadcast(self, cmd, target=ALL, kind="shell", timeout=None, skip=None):
+        """Queue cmd on every TV in target at once; each runs on its own executor.
+
+        timeout is per TV: a box that hasn't run the command by then drops it.
+        skip(tv) -> True leaves a TV out (e.g. screen known to be off).
+        """
+        sent = []
+        for tv in self.select(target):
+            if skip and skip(tv):
+                continue
+            tv.adb.shell(cmd, kind=kind, timeout=timeout)
+            sent.append(tv)
+        return sent
+
+    def start(self):
+        self.started = True
+        for tv in self.devices.values():
+            tv.start()
+
+    def stop(self):
+        for tv in self.devices.values():
+            tv.stop()